@@ -1,12 +1,16 @@
 from __future__ import annotations
 
 from logging import getLogger
+from re import compile as re_compile
+from time import monotonic
 from typing import TYPE_CHECKING
 
 from ipc.core.errors import NotConnected
 from ipc.core.event_manager import EventManager
+from ipc.core.message_queue import MessageQueue
 from ipc.core.protocol import Protocol
 from ipc.core.utils import (
+    NULL,
     future,
     json_dumps,
     json_loads,
@@ -20,25 +24,57 @@ if TYPE_CHECKING:
     from types import TracebackType
     from typing import (
         Any,
+        AsyncIterator,
         Callable,
         Coroutine,
+        List,
         Optional,
         Type,
     )
     from typing_extensions import Self
 
-__all__ = ('BaseConnection',)
+__all__ = (
+    'BaseConnection',
+    'encode_frame',
+)
 
 _WHITESPACE = b' '
+# Frames are '<length> <json>', or '<length>:<json>' for protocol frames
+# the library sends itself, so they are never mistaken for data passed to send()
+_FRAME_HEADER = re_compile(rb'(\d+)([ :])')
+_DIGITS = b'0123456789'
 _LOGGER = getLogger(__name__)
 
+# Keys of the protocol frames used by heartbeats
+PING_KEY = '__ipc_ping__'
+PONG_KEY = '__ipc_pong__'
+
+
+def encode_frame(data: Any, *, protocol: bool = False) -> bytes:
+    """Serialize ``data`` and prefix it with its length, ready to be written to a transport.
+
+    `data` must be an object :func:`json.dumps` can serialize. Protocol frames
+    are handled by :meth:`BaseConnection._handle_protocol_message` on the other
+    side, rather than dispatched as messages.
+    """
+    json = json_dumps(data)
+
+    return f'{len(json)}{":" if protocol else " "}'.encode() + json
+
 
 def _repr_prefix(c: BaseConnection) -> str:
     return f'Connection {hex(id(c))}'
 
 
 class BaseConnection(EventManager):
-    """Base class for objects that represent a connection."""
+    """Base class for objects that represent a connection.
+
+    Attributes
+    ----------
+    rtt: Optional[:class:`float`]
+        The round-trip time in seconds measured by the last heartbeat,
+        or ``None`` if no heartbeat has been answered yet.
+    """
 
     if TYPE_CHECKING:
         _read_buffer: bytearray
@@ -47,6 +83,12 @@ class BaseConnection(EventManager):
         _transport: Transport
         _close_waiter: Future[None]
         _paused: bool
+        _message_queues: List[MessageQueue]
+        _reading_paused: bool
+        _reading_stopped: bool
+        _resume_waiter: Optional[Future[None]]
+        _last_received: float
+        rtt: Optional[float]
         # must be implemented by subclasses
         host: str
         port: int
@@ -58,12 +100,24 @@ class BaseConnection(EventManager):
         '_transport',
         '_close_waiter',
         '_paused',
+        '_message_queues',
+        '_reading_paused',
+        '_reading_stopped',
+        '_resume_waiter',
+        '_last_received',
+        'rtt',
     )
 
     def __init__(self):
         super().__init__()
 
         self._paused = False
+        self._reading_paused = False
+        self._reading_stopped = False
+        self._resume_waiter = None
+        self._message_queues = []
+        self._last_received = 0.0
+        self.rtt = None
         self._write_buffer = None
         self._read_buffer = bytearray()
         self._protocol = Protocol(
@@ -111,6 +165,19 @@ class BaseConnection(EventManager):
         """:class:`bool`: Whether this connection is open."""
         return hasattr(self, '_transport') and not self._transport.is_closing()
 
+    @property
+    def idle_time(self) -> float:
+        """:class:`float`: The number of seconds since data was last received."""
+        return monotonic() - self._last_received
+
+    def ping(self) -> Self:
+        """Send a heartbeat to the other side of this connection.
+
+        Both :class:`Client` and :class:`Connection` reply to heartbeats
+        automatically, and :attr:`.rtt` is updated once the reply is received.
+        """
+        return self._send_protocol({PING_KEY: monotonic()})
+
     # Internals
 
     def send(self, data: Any) -> Self:
@@ -121,23 +188,16 @@ class BaseConnection(EventManager):
         if not self.connected:
             raise NotConnected('Connection is closed.')
 
-        json = json_dumps(data)
-
-        to_send = json.encode() if isinstance(json, str) else json
-
-        to_send = f'{len(to_send)} '.encode() + to_send
+        self._write(encode_frame(data))
 
-        if self._paused:
-            if self._write_buffer is None:
-                self._write_buffer = bytearray()
+        return self
 
-            self._write_buffer.extend(to_send)
-            _LOGGER.debug(
-                f'{_repr_prefix(self)}: buffering data as the transport is paused'
-            )
+    def _send_protocol(self, data: Any) -> Self:
+        """Same as :meth:`.send`, but sends ``data`` as a protocol frame."""
+        if not self.connected:
+            raise NotConnected('Connection is closed.')
 
-        else:
-            self._transport.write(to_send)
+        self._write(encode_frame(data, protocol=True))
 
         return self
 
@@ -149,10 +209,77 @@ class BaseConnection(EventManager):
     ) -> Coroutine[Any, Any, Any]:
         """Shorthand method for ``wait_for('message')``.
 
-        See :meth:`.wait_for` for more info.
+        See :meth:`.wait_for` for more info. To consume a stream
+        of messages, :meth:`.messages` should be preferred.
         """
         return self.wait_for('message', predicate=predicate, timeout=timeout)
 
+    async def messages(self, *, maxsize: int = 0) -> AsyncIterator[Any]:
+        """Iterate over received messages until the connection is closed.
+
+        Messages are stored in a queue from the moment iteration starts,
+        so none are missed between iterations. Once ``maxsize`` messages are
+        queued, reading from the transport is paused until the consumer catches up.
+
+        .. note::
+            Messages are still dispatched to ``message`` event listeners.
+
+        Parameters
+        ----------
+        maxsize: :class:`int`, default: 0
+            The number of queued messages at which reading is paused.
+            If this is ``0`` or less, the queue is unbounded.
+
+        Examples
+        --------
+        Usage ::
+
+            async for data in connection.messages(maxsize=100):
+                do_stuff_with_data(data)
+        """
+        if not self.connected:
+            raise NotConnected('Connection is closed.')
+
+        queue = MessageQueue(maxsize)
+        queues = self._message_queues
+
+        queues.append(queue)
+
+        try:
+            while True:
+                data = await queue.get()
+
+                if data is NULL:
+                    return
+
+                self._maybe_resume_reading()
+
+                yield data
+        finally:
+            queues.remove(queue)
+
+            self._maybe_resume_reading()
+
+    def _write(self, frame: bytes) -> bool:
+        """Write an already encoded frame, buffering it if writes are paused.
+
+        Returns whether the frame was buffered.
+        """
+        if self._paused:
+            if self._write_buffer is None:
+                self._write_buffer = bytearray()
+
+            self._write_buffer.extend(frame)
+            _LOGGER.debug(
+                f'{_repr_prefix(self)}: buffering data as the transport is paused'
+            )
+
+            return True
+
+        self._transport.write(frame)
+
+        return False
+
     def _wait_closed(self) -> Future[None]:
         """:class:`asyncio.Future`: Return a future that resolves
         when :meth:`._protocol_cb_connection_lost` is called.
@@ -162,11 +289,56 @@ class BaseConnection(EventManager):
 
         return self._close_waiter
 
+    def _maybe_resume_reading(self) -> None:
+        """Resume reading from the transport if it was paused
+        by :meth:`.messages` and no queue is full anymore.
+        """
+        if not self._reading_paused or self._reading_stopped or not self.connected:
+            return
+
+        for queue in self._message_queues:
+            if queue.full():
+                return
+
+        self._reading_paused = False
+        self._transport.resume_reading()
+        _LOGGER.debug(f'{_repr_prefix(self)}: message queues drained, reading resumed')
+
+    def _stop_reading(self) -> None:
+        """Stop reading from the transport for the rest of this connection's lifetime."""
+        self._reading_stopped = True
+
+        if not self._reading_paused and self.connected:
+            self._reading_paused = True
+            self._transport.pause_reading()
+
+    async def _wait_resumed(self) -> None:
+        """Wait until writes are no longer paused, so the write buffer
+        has been handed to the transport, or the connection is lost.
+        """
+        if not self._paused or not self.connected:
+            return
+
+        if self._resume_waiter is None:
+            self._resume_waiter = future()
+
+        await self._resume_waiter
+
+    def _wake_resume_waiter(self) -> None:
+        waiter = self._resume_waiter
+
+        if waiter is not None:
+            self._resume_waiter = None
+
+            if not waiter.done():
+                waiter.set_result(None)
+
     # Asyncio callbacks
 
     def _protocol_cb_connection_made(self, transport: Transport) -> None:
         """Called when the connection is made."""
         self._transport = transport
+        self._last_received = monotonic()
 
         self.dispatch('connect')
 
@@ -174,6 +346,16 @@ class BaseConnection(EventManager):
         """Called when the connection is lost."""
         del self._transport
 
+        self._reading_paused = False
+        self._reading_stopped = False
+        self._paused = False
+        self._write_buffer = None
+
+        for queue in self._message_queues:
+            queue.close()
+
+        self._wake_resume_waiter()
+
         if hasattr(self, '_close_waiter'):
             self._close_waiter.set_result(None)
 
@@ -188,15 +370,22 @@ class BaseConnection(EventManager):
 
         buffer.extend(data)
 
+        self._last_received = monotonic()
+
         while True:
-            ws_idx = buffer.find(_WHITESPACE)
+            header = _FRAME_HEADER.match(buffer)
 
-            if ws_idx == -1:
+            if header is None:
+                if buffer.lstrip(_DIGITS):
+                    raise ValueError(f'Malformed frame header: {bytes(buffer[:32])!r}')
+
+                # Wait for the rest of the header
                 return
 
-            length = int(buffer[:ws_idx])
+            length = int(header.group(1))
+            protocol = header.group(2) != _WHITESPACE
 
-            start = ws_idx + 1  # incr by 1 for ws char
+            start = header.end()
             end = start + length
 
             d = buffer[start:end]
@@ -206,7 +395,45 @@ class BaseConnection(EventManager):
 
             del buffer[:end]
 
-            self.dispatch('message', json_loads(d if d.__class__ is bytes else bytes(d)))
+            message = json_loads(d if d.__class__ is bytes else bytes(d))
+
+            if protocol:
+                self._handle_protocol_message(message)
+            else:
+                self._handle_message(message)
+
+    def _handle_message(self, message: Any) -> None:
+        """Called for each decoded message, which is passed on
+        to :meth:`.messages` and ``message`` listeners.
+        """
+        for queue in self._message_queues:
+            queue.put(message)
+
+            if queue.full() and not self._reading_paused:
+                self._reading_paused = True
+                self._transport.pause_reading()
+                _LOGGER.debug(
+                    f'{_repr_prefix(self)}: pausing reads as a message queue is full'
+                )
+
+        self.dispatch('message', message)
+
+    def _handle_protocol_message(self, message: Any) -> None:
+        """Called for each decoded protocol frame, sent with :meth:`._send_protocol`.
+
+        Heartbeats are handled here. Subclasses that implement a protocol on top
+        of this one, e.g. :class:`rpc.Client`, should pass on the frames they
+        don't recognize.
+        """
+        if message.__class__ is dict:
+            if PING_KEY in message:
+                self._send_protocol({PONG_KEY: message[PING_KEY]})
+
+            elif PONG_KEY in message:
+                sent_at = message[PONG_KEY]
+
+                if isinstance(sent_at, (int, float)):
+                    self.rtt = monotonic() - sent_at
 
     def _protocol_cb_eof_received(self) -> bool:
         """Called when eof is received."""
@@ -234,3 +461,5 @@ class BaseConnection(EventManager):
             _LOGGER.debug(f'{_repr_prefix(self)}: buffered data has been written')
 
             self._write_buffer.clear()
+
+        self._wake_resume_waiter()
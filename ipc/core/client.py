@@ -7,13 +7,21 @@ from asyncio import (
 from typing import TYPE_CHECKING
 
 from ipc.core.base_connection import BaseConnection
+from ipc.core.topics import (
+    PUBLISH_KEY,
+    SUBSCRIBE_KEY,
+    UNSUBSCRIBE_KEY,
+    validate_pattern,
+)
 from ipc.core.utils import future
 
 if TYPE_CHECKING:
+    from asyncio import Transport
     from typing import (
         Any,
         Coroutine,
         Optional,
+        Set,
         overload,
     )
     from typing_extensions import (
@@ -31,12 +39,14 @@ class Client(BaseConnection):
     if TYPE_CHECKING:
         host: str
         port: int
+        _subscriptions: Set[str]
 
     def __init__(self, host: str, port: int) -> None:
         super().__init__()
 
         self.host = host
         self.port = port
+        self._subscriptions = set()
 
     async def __aenter__(self) -> Self:
         await self.connect()
@@ -114,7 +124,83 @@ class Client(BaseConnection):
 
         return self
 
+    def subscribe(self, *patterns: str) -> Self:
+        """Subscribe to topics published by the server with :meth:`Server.publish`.
+
+        Published data is dispatched to ``publish`` event listeners.
+        Subscriptions made while disconnected are sent once the client
+        connects, and are sent again if it reconnects.
+
+        Parameters
+        ----------
+        *patterns: :class:`str`
+            Topic names made of ``.`` separated segments. A ``*`` segment
+            matches exactly one segment and a trailing ``#`` segment matches
+            zero or more segments.
+
+        Examples
+        --------
+        Usage ::
+
+            @client.listener('publish')
+            def on_publish(topic, data):
+                ...
+
+            client.subscribe('prices.*', 'news.#')
+        """
+        for pattern in patterns:
+            validate_pattern(pattern)
+
+        new = [pattern for pattern in patterns if pattern not in self._subscriptions]
+
+        if new:
+            self._subscriptions.update(new)
+
+            if self.connected:
+                self._send_protocol({SUBSCRIBE_KEY: new})
+
+        return self
+
+    def unsubscribe(self, *patterns: str) -> Self:
+        """Unsubscribe from topic patterns passed to :meth:`.subscribe`.
+
+        Parameters
+        ----------
+        *patterns: :class:`str`
+            The topic patterns.
+        """
+        old = [pattern for pattern in patterns if pattern in self._subscriptions]
+
+        if old:
+            self._subscriptions.difference_update(old)
+
+            if self.connected:
+                self._send_protocol({UNSUBSCRIBE_KEY: old})
+
+        return self
+
+    @property
+    def subscriptions(self) -> Set[str]:
+        """The topic patterns this client is subscribed to."""
+        return self._subscriptions.copy()
+
+    # Internals
+
+    def _handle_protocol_message(self, message: Any) -> None:
+        if message.__class__ is dict and PUBLISH_KEY in message:
+            self.dispatch('publish', message[PUBLISH_KEY], message.get('data'))
+            return
+
+        super()._handle_protocol_message(message)
+
     # Asyncio callbacks
+
+    def _protocol_cb_connection_made(self, transport: Transport) -> None:
+        super()._protocol_cb_connection_made(transport)
+
+        if self._subscriptions:
+            self._send_protocol({SUBSCRIBE_KEY: list(self._subscriptions)})
+
     def _protocol_cb_connection_lost(self, exc: Optional[Exception]) -> None:
         self._stop_events = True
         return super()._protocol_cb_connection_lost(exc)
@@ -128,3 +214,6 @@ class Client(BaseConnection):
 
         def on_message(self, data: Any) -> ...:
             ...
+
+        def on_publish(self, topic: str, data: Any) -> ...:
+            ...
@@ -2,31 +2,55 @@ from __future__ import annotations
 
 from typing import TYPE_CHECKING
 
-from ipc.core.base_connection import BaseConnection
+from ipc.core.base_connection import (
+    PING_KEY,
+    PONG_KEY,
+    BaseConnection,
+)
+from ipc.core.topics import (
+    SUBSCRIBE_KEY,
+    UNSUBSCRIBE_KEY,
+)
 
 if TYPE_CHECKING:
     from asyncio import Transport
     from typing import (
         Any,
         Optional,
+        Set,
     )
 
     from ipc.core.server import Server
+    from ipc.core.timer_wheel import TimerHandle
 
 
 __all__ = ('Connection',)
 
 
 class Connection(BaseConnection):
-    """Represents a client connection to the server"""
+    """Represents a client connection to the server
+
+    Attributes
+    ----------
+    id: :class:`int`
+        An identifier for this connection, unique to the server it belongs to.
+        IDs are assigned in increasing order and are never reused.
+    """
 
     if TYPE_CHECKING:
         _server: Server
+        _subscriptions: Set[str]
+        _heartbeat_timer: Optional[TimerHandle]
+        id: int
+
+    _heartbeat_timer = None
 
     def __init__(self, server: Server) -> None:
         super().__init__()
 
         self._server = server
+        self._subscriptions = set()
+        self.id = next(server._connection_ids)
 
     # Properties
 
@@ -38,6 +62,11 @@ class Connection(BaseConnection):
     def port(self) -> int:
         return self._server.port
 
+    @property
+    def subscriptions(self) -> Set[str]:
+        """The topic patterns this connection is subscribed to."""
+        return self._subscriptions.copy()
+
     # Internals
 
     def dispatch(self, event: str, *args: Any) -> None:
@@ -47,14 +76,85 @@ class Connection(BaseConnection):
         # but with the connection object as the first argument
         self._server.dispatch(event, self, *args)
 
+    def _handle_protocol_message(self, message: Any) -> None:
+        if message.__class__ is dict:
+            if SUBSCRIBE_KEY in message:
+                self._update_subscriptions(message[SUBSCRIBE_KEY], subscribe=True)
+                return
+
+            if UNSUBSCRIBE_KEY in message:
+                self._update_subscriptions(message[UNSUBSCRIBE_KEY], subscribe=False)
+                return
+
+            if PING_KEY in message or PONG_KEY in message:
+                super()._handle_protocol_message(message)
+                return
+
+        if not self._stop_events:
+            self._server._handle_protocol_message(self, message)
+
+    def _update_subscriptions(self, patterns: Any, *, subscribe: bool) -> None:
+        """Handle a subscription message sent by :meth:`Client.subscribe`
+        or :meth:`Client.unsubscribe`, ignoring malformed patterns.
+        """
+        if not isinstance(patterns, list):
+            return
+
+        topics = self._server._topics
+        subscriptions = self._subscriptions
+        changed = []
+
+        for pattern in patterns:
+            # Unhashable patterns can't even be looked up
+            if not isinstance(pattern, str):
+                continue
+
+            if subscribe:
+                if pattern in subscriptions:
+                    continue
+
+                try:
+                    topics.add(pattern, self)
+                except (TypeError, ValueError):
+                    continue
+
+                subscriptions.add(pattern)
+
+            else:
+                if pattern not in subscriptions:
+                    continue
+
+                topics.remove(pattern, self)
+                subscriptions.discard(pattern)
+
+            changed.append(pattern)
+
+        if changed:
+            self.dispatch('subscribe' if subscribe else 'unsubscribe', changed)
+
     # Asyncio callbacks
 
     def _protocol_cb_connection_made(self, transport: Transport) -> None:
-        self._server._connections.append(self)
+        self._server._connections[self.id] = self
 
         super()._protocol_cb_connection_made(transport)
 
+        self._server._schedule_heartbeat(self)
+
     def _protocol_cb_connection_lost(self, exc: Optional[Exception]) -> None:
-        self._server._connections.remove(self)
+        server = self._server
+
+        server._connections.pop(self.id, None)
+
+        if self._heartbeat_timer is not None:
+            self._heartbeat_timer.cancel()
+            self._heartbeat_timer = None
+
+        for pattern in self._subscriptions:
+            server._topics.remove(pattern, self)
+
+        self._subscriptions.clear()
+
+        server._connection_lost(self)
 
         super()._protocol_cb_connection_lost(exc)
@@ -3,14 +3,17 @@ from __future__ import annotations
 from asyncio import (
     CancelledError,
     TimeoutError,
-    wait_for,
+    get_running_loop,
 )
 from logging import getLogger
 from sys import stderr
+from time import perf_counter
 from traceback import print_exc
 from typing import TYPE_CHECKING
 
+from ipc.core.event_stats import EventStats
 from ipc.core.utils import (
+    expire_future,
     future,
     maybe_awaitable,
     task,
@@ -89,8 +92,10 @@ class EventManager:
     if TYPE_CHECKING:
         _listeners: Dict[str, List[Callable[..., Any]]]
         _stop_events: bool
+        _stats: Optional[Dict[str, EventStats]]
 
     _stop_events = False
+    _stats = None
 
     def __init__(self, *args: Any, **kwargs: Any) -> None:
         super().__init__(*args, **kwargs)
@@ -113,6 +118,15 @@ class EventManager:
         """
         _ensure_string(event)
 
+        stats = self._stats
+
+        if stats is not None:
+            try:
+                stats[event].dispatches += 1
+            except KeyError:
+                event_stats = stats[event] = EventStats()
+                event_stats.dispatches = 1
+
         if not root:
             try:
                 listeners = self._listeners[event]
@@ -190,10 +204,14 @@ class EventManager:
         msg += f' with args {args} for {self}'
         _LOGGER.debug(msg)
 
-        task(
-            self._wrap_listener(listener, *args, handle_errors=handle_errors),
-            name=f'py-ipc event: {event}',
-        )
+        if self._stats is None:
+            coro = self._wrap_listener(listener, *args, handle_errors=handle_errors)
+        else:
+            coro = self._wrap_listener_timed(
+                event, perf_counter(), listener, *args, handle_errors=handle_errors
+            )
+
+        task(coro, name=f'py-ipc event: {event}')
 
     async def _wrap_listener(
         self, listener: Callable[..., Any], *args: Any, handle_errors: bool
@@ -212,10 +230,79 @@ class EventManager:
             else:
                 raise exc
 
+    async def _wrap_listener_timed(
+        self,
+        event: str,
+        scheduled_at: float,
+        listener: Callable[..., Any],
+        *args: Any,
+        handle_errors: bool,
+    ) -> None:
+        """Same as :meth:`._wrap_listener`, but records the time ``listener``
+        spent queued and running in :meth:`.stats`.
+        """
+        started_at = perf_counter()
+
+        try:
+            await self._wrap_listener(listener, *args, handle_errors=handle_errors)
+        finally:
+            stats = self._stats
+
+            # Stats may have been disabled while the listener was running
+            if stats is not None:
+                try:
+                    event_stats = stats[event]
+                except KeyError:
+                    event_stats = stats[event] = EventStats()
+
+                event_stats.record(started_at - scheduled_at, perf_counter() - started_at)
+
     async def _handle_error(self, exc: Exception, *args: Any) -> None:
         """Call :meth:`.on_error` with the given arguments."""
         await maybe_awaitable(self.on_error, exc, *args)
 
+    # Stats
+
+    def enable_stats(self) -> Self:
+        """Start recording per-event dispatch metrics, readable through :meth:`.stats`.
+
+        Recording is disabled by default and costs nothing while disabled.
+        Calling this method while recording is enabled does nothing.
+        """
+        if self._stats is None:
+            self._stats = {}
+
+        return self
+
+    def disable_stats(self) -> Self:
+        """Stop recording dispatch metrics and discard those recorded so far."""
+        self._stats = None
+
+        return self
+
+    def stats(self) -> Dict[str, EventStats]:
+        """Get a snapshot of the dispatch metrics recorded for each event.
+
+        This includes the number of dispatches, the time listeners were queued
+        before running and a histogram of their execution time. Root listeners
+        are included. If recording is disabled, an empty dict is returned.
+
+        Examples
+        --------
+        Usage ::
+
+            server.enable_stats()
+            ...
+            for event, stats in server.stats().items():
+                print(event, stats.dispatches, stats.percentile(99))
+        """
+        stats = self._stats
+
+        if stats is None:
+            return {}
+
+        return {event: event_stats.copy() for event, event_stats in stats.items()}
+
     # Managing listeners
 
     def listener(self, event: str, *, root: bool = False) -> Callable[[FuncT], FuncT]:
@@ -500,14 +587,22 @@ class EventManager:
         fut = future()
 
         predicate.__ipc_event_waiter__ = fut
+        timer = (
+            get_running_loop().call_later(timeout, expire_future, fut)
+            if timeout is not None
+            else None
+        )
 
         try:
-            return await wait_for(fut, timeout)
+            return await fut
         except (CancelledError, TimeoutError):
             self.remove_listener(event, predicate)
             del predicate.__ipc_event_waiter__
 
             raise
+        finally:
+            if timer is not None:
+                timer.cancel()
 
     # Default event listeners
 
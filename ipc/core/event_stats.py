@@ -0,0 +1,116 @@
+from __future__ import annotations
+
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from typing import List
+    from typing_extensions import Self
+
+__all__ = ('EventStats',)
+
+_BUCKETS = 32
+
+
+def _bucket_for(seconds: float) -> int:
+    # Bucket 0 holds durations under 1µs, bucket i holds [2**(i-1), 2**i) µs.
+    return min(int(seconds * 1_000_000).bit_length(), _BUCKETS - 1)
+
+
+class EventStats:
+    """Dispatch metrics for a single event, as returned by :meth:`EventManager.stats`.
+
+    Execution times are kept in a histogram of power-of-two microsecond buckets.
+    """
+
+    if TYPE_CHECKING:
+        dispatches: int
+        calls: int
+        queue_time: float
+        max_queue_time: float
+        exec_time: float
+        max_exec_time: float
+        histogram: List[int]
+
+    __slots__ = (
+        'dispatches',
+        'calls',
+        'queue_time',
+        'max_queue_time',
+        'exec_time',
+        'max_exec_time',
+        'histogram',
+    )
+
+    def __init__(self) -> None:
+        self.dispatches = 0
+        self.calls = 0
+        self.queue_time = 0.0
+        self.max_queue_time = 0.0
+        self.exec_time = 0.0
+        self.max_exec_time = 0.0
+        self.histogram = [0] * _BUCKETS
+
+    def __repr__(self) -> str:
+        return (
+            f'<{type(self).__name__} dispatches={self.dispatches} calls={self.calls} '
+            f'mean_queue_time={self.mean_queue_time:.6f} '
+            f'mean_exec_time={self.mean_exec_time:.6f}>'
+        )
+
+    @property
+    def mean_queue_time(self) -> float:
+        """:class:`float`: The mean number of seconds listeners waited before running."""
+        return self.queue_time / self.calls if self.calls else 0.0
+
+    @property
+    def mean_exec_time(self) -> float:
+        """:class:`float`: The mean number of seconds listeners took to run."""
+        return self.exec_time / self.calls if self.calls else 0.0
+
+    def percentile(self, percent: float) -> float:
+        """Return an upper bound, in seconds, of the given execution time percentile.
+
+        The result is only as precise as the histogram buckets.
+
+        Parameters
+        ----------
+        percent: :class:`float`
+            A number between ``0`` and ``100``.
+        """
+        if not self.calls:
+            return 0.0
+
+        target = self.calls * percent / 100
+        seen = 0
+
+        for idx, count in enumerate(self.histogram):
+            seen += count
+
+            if count and seen >= target:
+                return (1 << idx) / 1_000_000
+
+        return self.max_exec_time
+
+    def copy(self) -> Self:
+        """Return a snapshot of these stats."""
+        new = self.__class__()
+
+        for attr in self.__slots__:
+            setattr(new, attr, getattr(self, attr))
+
+        new.histogram = self.histogram.copy()
+
+        return new
+
+    def record(self, queue_time: float, exec_time: float) -> None:
+        """Record a single listener call."""
+        self.calls += 1
+        self.queue_time += queue_time
+        self.exec_time += exec_time
+        self.histogram[_bucket_for(exec_time)] += 1
+
+        if queue_time > self.max_queue_time:
+            self.max_queue_time = queue_time
+
+        if exec_time > self.max_exec_time:
+            self.max_exec_time = exec_time
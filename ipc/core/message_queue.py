@@ -0,0 +1,97 @@
+from __future__ import annotations
+
+from collections import deque
+from typing import TYPE_CHECKING
+
+from ipc.core.utils import (
+    NULL,
+    future,
+)
+
+if TYPE_CHECKING:
+    from asyncio import Future
+    from typing import (
+        Any,
+        Deque,
+        Optional,
+    )
+
+__all__ = ('MessageQueue',)
+
+
+class MessageQueue:
+    """A FIFO of received messages, consumed by :meth:`BaseConnection.messages`.
+
+    Putting never blocks, as the transport has already read the data.
+    Instead, :meth:`.full` is used by the connection to pause reading from
+    the transport until the consumer catches up.
+    """
+
+    if TYPE_CHECKING:
+        maxsize: int
+        _items: Deque[Any]
+        _waiter: Optional[Future[None]]
+        _closed: bool
+
+    __slots__ = (
+        'maxsize',
+        '_items',
+        '_waiter',
+        '_closed',
+    )
+
+    def __init__(self, maxsize: int = 0) -> None:
+        self.maxsize = maxsize
+        self._items = deque()
+        self._waiter = None
+        self._closed = False
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    def full(self) -> bool:
+        """Whether the queue holds ``maxsize`` or more messages.
+
+        A queue with a ``maxsize`` of ``0`` or less is never full.
+        """
+        return 0 < self.maxsize <= len(self._items)
+
+    def put(self, item: Any) -> None:
+        """Append a message and wake up the consumer, if any."""
+        self._items.append(item)
+        self._wakeup()
+
+    def close(self) -> None:
+        """Mark the queue as closed.
+
+        Messages already queued can still be retrieved, after which
+        :meth:`.get` returns :data:`NULL`.
+        """
+        self._closed = True
+        self._wakeup()
+
+    async def get(self) -> Any:
+        """Remove and return the oldest message, waiting for one if needed.
+
+        Returns :data:`NULL` once the queue is closed and empty.
+        """
+        items = self._items
+
+        while not items:
+            if self._closed:
+                return NULL
+
+            self._waiter = future()
+
+            try:
+                await self._waiter
+            finally:
+                self._waiter = None
+
+        return items.popleft()
+
+    def _wakeup(self) -> None:
+        waiter = self._waiter
+
+        if waiter is not None and not waiter.done():
+            waiter.set_result(None)
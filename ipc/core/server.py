@@ -2,27 +2,46 @@ from __future__ import annotations
 
 from asyncio import (
     CancelledError,
+    TimeoutError,
     gather,
     get_event_loop,
     run,
+    sleep,
+    wait_for,
 )
+from itertools import count
+from logging import getLogger
 from typing import (
     TYPE_CHECKING,
     Callable,
+    List,
+    NamedTuple,
 )
 
+from ipc.core.base_connection import encode_frame
 from ipc.core.connection import Connection
 from ipc.core.event_manager import EventManager
+from ipc.core.timer_wheel import TimerWheel
+from ipc.core.topics import (
+    PUBLISH_KEY,
+    TopicTrie,
+)
 
 if TYPE_CHECKING:
-    from asyncio import AbstractServer
+    from asyncio import (
+        AbstractServer,
+        Future,
+    )
     from types import TracebackType
     from typing import (
         Any,
         Coroutine,
-        List,
+        Dict,
+        Iterable,
+        Iterator,
         Optional,
         Type,
+        ValuesView,
         overload,
     )
     from typing_extensions import (
@@ -33,17 +52,64 @@ if TYPE_CHECKING:
     from ipc.core.protocol import Protocol
 
 
-__all__ = ('Server',)
+__all__ = (
+    'BroadcastResult',
+    'Server',
+)
+
+_LOGGER = getLogger(__name__)
+
+
+class BroadcastResult(NamedTuple):
+    """The outcome of :meth:`Server.broadcast`.
+
+    Attributes
+    ----------
+    sent: :class:`int`
+        The number of connections the data was written to.
+    buffered: List[:class:`Connection`]
+        Connections that were paused, so the data was buffered until they resume.
+    skipped: List[:class:`Connection`]
+        Connections that were paused or closed, so the data was not sent.
+    """
+
+    sent: int
+    buffered: List[Connection]
+    skipped: List[Connection]
 
 
 class Server(EventManager):
+    """Represents a server that accepts connections from clients.
+
+    Parameters
+    ----------
+    host: :class:`str`
+        The host to listen on.
+    port: :class:`int`
+        The port to listen on.
+    connection_factory: Callable[[:class:`Server`], :class:`Connection`]
+        A callable that returns a connection object for each accepted connection.
+    heartbeat_interval: Optional[:class:`float`], default: None
+        If set, each connection is pinged every ``heartbeat_interval`` seconds,
+        which keeps :attr:`Connection.rtt` up to date.
+    idle_timeout: Optional[:class:`float`], default: None
+        If set, connections that have not sent any data for ``idle_timeout``
+        seconds are aborted. This is checked every ``heartbeat_interval`` seconds,
+        or every ``idle_timeout`` seconds if heartbeats are disabled.
+    """
+
     if TYPE_CHECKING:
         host: str
         port: int
         _connected: bool
-        _connections: List[Connection]
+        _connections: Dict[int, Connection]
+        _connection_ids: Iterator[int]
+        _topics: TopicTrie
+        _timers: Optional[TimerWheel]
         _server: AbstractServer
         connection_factory: Callable[[Server], Connection]
+        heartbeat_interval: Optional[float]
+        idle_timeout: Optional[float]
 
     _connected = False
 
@@ -53,13 +119,25 @@ class Server(EventManager):
         port: int,
         *,
         connection_factory: Callable[[Server], Connection] = Connection,
+        heartbeat_interval: Optional[float] = None,
+        idle_timeout: Optional[float] = None,
     ) -> None:
         super().__init__()
 
         self.host = host
         self.port = port
         self.connection_factory = connection_factory
-        self._connections = []
+        self.heartbeat_interval = heartbeat_interval
+        self.idle_timeout = idle_timeout
+        self._connections = {}
+        self._connection_ids = count(1)
+        self._topics = TopicTrie()
+
+        check_interval = heartbeat_interval or idle_timeout
+
+        # A single timer wheel drives heartbeats for every connection,
+        # rather than a loop timer per connection.
+        self._timers = TimerWheel(check_interval / 10) if check_interval else None
 
     def __repr__(self) -> str:
         return (
@@ -142,6 +220,8 @@ class Server(EventManager):
                 if self._stop_events:
                     self._stop_events = False
 
+                self._started()
+
                 # Signal that we are ready to start accepting connections
                 self.dispatch('ready')
 
@@ -180,14 +260,102 @@ class Server(EventManager):
         if len(self._connections):
             coros: List[Coroutine[Any, Any, Any]] = []
 
-            for connection in self._connections:
+            for connection in self._connections.values():
                 connection._stop_events = True
                 coros.append(connection.close())
 
             await gather(*coros)
 
+        if self._timers is not None:
+            self._timers.close()
+
         return self
 
+    async def drain(self, timeout: Optional[float] = None) -> Self:
+        """Gracefully close the server along with any open connections.
+
+        The server stops accepting connections and stops reading from open ones.
+        Work already received is then allowed to finish and buffered writes
+        are flushed before connections are closed. If this takes longer than
+        ``timeout`` seconds, remaining connections are aborted.
+
+        Parameters
+        ----------
+        timeout: Optional[:class:`float`], default: None
+            The number of seconds to wait before aborting connections.
+
+        Examples
+        --------
+        Usage ::
+
+            # e.g. in a SIGTERM handler
+            await server.drain(timeout=30)
+        """
+        for connection in self._connections.values():
+            connection._stop_reading()
+
+        await self.disconnect()
+
+        try:
+            await wait_for(self._drain(), timeout)
+        except TimeoutError:
+            waiters: List[Future[None]] = []
+
+            for connection in self._connections.values():
+                connection._stop_events = True
+
+                if connection.connected:
+                    connection._transport.abort()
+                    waiters.append(connection._wait_closed())
+
+            await gather(*waiters)
+
+            if self._timers is not None:
+                self._timers.close()
+
+        return self
+
+    async def _drain(self) -> None:
+        """Wait for in-flight work and buffered writes, then close every connection."""
+        # Let listeners already scheduled for received messages start running
+        await sleep(0)
+
+        await self._wait_in_flight()
+
+        await gather(
+            *(connection._wait_resumed() for connection in self._connections.values())
+        )
+
+        await self.close()
+
+    def _handle_protocol_message(self, connection: Connection, message: Any) -> None:
+        """Called for each protocol frame received by ``connection``.
+
+        These are ignored unless a subclass implements a protocol on top of this one,
+        e.g. :class:`rpc.Server`.
+        """
+
+    def _connection_lost(self, connection: Connection) -> None:
+        """Called when ``connection`` is lost, before the ``disconnect`` event is dispatched.
+
+        Subclasses that keep state per connection, e.g. :class:`rpc.Server`,
+        should override this.
+        """
+
+    def _started(self) -> None:
+        """Called once the server is online, before the ``ready`` event is dispatched.
+
+        Subclasses that need to start background work, e.g. :class:`rpc.Server`,
+        should override this.
+        """
+
+    async def _wait_in_flight(self) -> None:
+        """Wait for work started by received messages to finish.
+
+        Subclasses that process messages in the background,
+        e.g. :class:`rpc.Server`, should override this.
+        """
+
     async def disconnect(self) -> Self:
         """Close the server.
 
@@ -213,7 +381,156 @@ class Server(EventManager):
     @property
     def connections(self) -> List[Connection]:
         """A list of open connections leased by this server."""
-        return self._connections.copy()
+        return list(self._connections.values())
+
+    def iter_connections(self) -> ValuesView[Connection]:
+        """Return a live, read-only view of open connections leased by this server.
+
+        Unlike :attr:`.connections`, the view is not copied, so it reflects
+        connections opened and closed after it was retrieved. Connections
+        must not be closed while iterating it.
+        """
+        return self._connections.values()
+
+    def broadcast(
+        self,
+        data: Any,
+        connections: Optional[Iterable[Connection]] = None,
+        *,
+        skip_paused: bool = True,
+    ) -> BroadcastResult:
+        """Send ``data`` to many connections at once.
+
+        Unlike calling :meth:`Connection.send` for each connection, ``data`` is only
+        serialized once and the same buffer is written to every transport.
+
+        Parameters
+        ----------
+        data: Any
+            An object :func:`json.dumps` can serialize.
+        connections: Optional[Iterable[:class:`Connection`]], default: None
+            The connections to send to. Defaults to all open connections.
+        skip_paused: :class:`bool`, default: True
+            Whether to skip connections whose writes are paused instead of
+            buffering the data until they resume.
+
+        Examples
+        --------
+        Usage ::
+
+            result = server.broadcast({'price': 123})
+
+            for connection in result.skipped:
+                ...
+        """
+        return self._broadcast_frame(encode_frame(data), connections, skip_paused)
+
+    def publish(
+        self, topic: str, data: Any, *, skip_paused: bool = True
+    ) -> BroadcastResult:
+        """Send ``data`` to connections subscribed to ``topic``.
+
+        Subscribers are resolved through the patterns passed to
+        :meth:`Client.subscribe` and ``data`` is only serialized once,
+        as with :meth:`.broadcast`. Clients receive it through the
+        ``publish`` event.
+
+        Parameters
+        ----------
+        topic: :class:`str`
+            The topic name, made of ``.`` separated segments.
+        data: Any
+            An object :func:`json.dumps` can serialize.
+        skip_paused: :class:`bool`, default: True
+            Whether to skip subscribers whose writes are paused instead of
+            buffering the data until they resume.
+
+        Examples
+        --------
+        Usage ::
+
+            server.publish('prices.AAPL', {'price': 123})
+        """
+        if not isinstance(topic, str):
+            raise TypeError(f'expected topic to be str, not {topic!r}')
+
+        subscribers = self._topics.match(topic)
+
+        if not subscribers:
+            return BroadcastResult(0, [], [])
+
+        return self._broadcast_frame(
+            encode_frame({PUBLISH_KEY: topic, 'data': data}, protocol=True),
+            subscribers,
+            skip_paused,
+        )
+
+    def get_connection(self, id: int) -> Optional[Connection]:
+        """Get an open connection by its :attr:`Connection.id`.
+
+        Parameters
+        ----------
+        id: :class:`int`
+            The connection ID.
+        """
+        return self._connections.get(id)
+
+    # Internals
+
+    def _broadcast_frame(
+        self,
+        frame: bytes,
+        connections: Optional[Iterable[Connection]],
+        skip_paused: bool,
+    ) -> BroadcastResult:
+        """Write an already encoded ``frame`` to many connections at once."""
+        if connections is None:
+            connections = self._connections.values()
+
+        sent = 0
+        buffered: List[Connection] = []
+        skipped: List[Connection] = []
+
+        for connection in connections:
+            if not connection.connected or (skip_paused and connection._paused):
+                skipped.append(connection)
+            elif connection._write(frame):
+                buffered.append(connection)
+            else:
+                sent += 1
+
+        return BroadcastResult(sent, buffered, skipped)
+
+    def _schedule_heartbeat(self, connection: Connection) -> None:
+        """Arrange for :meth:`._check_heartbeat` to be called for ``connection``."""
+        timers = self._timers
+
+        if timers is not None:
+            interval = self.heartbeat_interval or self.idle_timeout
+            assert interval is not None
+
+            connection._heartbeat_timer = timers.call_later(
+                interval, self._check_heartbeat, connection
+            )
+
+    def _check_heartbeat(self, connection: Connection) -> None:
+        """Reap ``connection`` if it has been idle for too long, ping it otherwise."""
+        connection._heartbeat_timer = None
+
+        if not connection.connected:
+            return
+
+        idle_timeout = self.idle_timeout
+
+        if idle_timeout is not None and connection.idle_time >= idle_timeout:
+            _LOGGER.debug(f'Aborting {connection} as it has been idle for too long')
+            connection._transport.abort()
+            return
+
+        if self.heartbeat_interval is not None:
+            connection.ping()
+
+        self._schedule_heartbeat(connection)
 
     # Default event listeners
 
@@ -241,3 +558,9 @@ class Server(EventManager):
 
         def on_message(self, connection: Connection, data: Any) -> ...:
             ...
+
+        def on_subscribe(self, connection: Connection, patterns: List[str]) -> ...:
+            ...
+
+        def on_unsubscribe(self, connection: Connection, patterns: List[str]) -> ...:
+            ...
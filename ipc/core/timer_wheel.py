@@ -0,0 +1,211 @@
+from __future__ import annotations
+
+from asyncio import get_running_loop
+from math import ceil
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from asyncio import (
+        AbstractEventLoop,
+        TimerHandle as LoopTimerHandle,
+    )
+    from typing import (
+        Any,
+        Callable,
+        List,
+        Optional,
+        Set,
+        Tuple,
+    )
+
+__all__ = (
+    'TimerHandle',
+    'TimerWheel',
+)
+
+
+class TimerHandle:
+    """A callback scheduled with :meth:`TimerWheel.call_later`."""
+
+    if TYPE_CHECKING:
+        _wheel: Optional[TimerWheel]
+        _callback: Callable[..., Any]
+        _args: Tuple[Any, ...]
+        _slot: int
+        _rounds: int
+
+    __slots__ = (
+        '_wheel',
+        '_callback',
+        '_args',
+        '_slot',
+        '_rounds',
+    )
+
+    def __init__(
+        self,
+        wheel: TimerWheel,
+        slot: int,
+        rounds: int,
+        callback: Callable[..., Any],
+        args: Tuple[Any, ...],
+    ) -> None:
+        self._wheel = wheel
+        self._slot = slot
+        self._rounds = rounds
+        self._callback = callback
+        self._args = args
+
+    def __repr__(self) -> str:
+        return f'<{type(self).__name__} callback={self._callback!r} active={self.active}>'
+
+    @property
+    def active(self) -> bool:
+        """:class:`bool`: Whether this timer has neither fired nor been cancelled."""
+        return self._wheel is not None
+
+    def cancel(self) -> None:
+        """Cancel this timer.
+
+        This method is idemponent.
+        """
+        wheel = self._wheel
+
+        if wheel is not None:
+            self._wheel = None
+            wheel._slots[self._slot].discard(self)
+            wheel._count -= 1
+
+
+class TimerWheel:
+    """Schedules many coarse timers using a single event loop timer.
+
+    Timers are hashed into a ring of slots by their expiry. The wheel advances
+    one slot every ``resolution`` seconds, so scheduling and cancelling are O(1)
+    and timers fire up to ``resolution`` seconds late, but never early.
+    The wheel only keeps a loop timer while it has pending timers.
+
+    Parameters
+    ----------
+    resolution: :class:`float`
+        The number of seconds between each tick.
+    slots: :class:`int`, default: 512
+        The number of slots in the ring. Timers further than ``slots`` ticks
+        away are kept in their slot for additional rounds.
+    """
+
+    if TYPE_CHECKING:
+        resolution: float
+        _slots: List[Set[TimerHandle]]
+        _cursor: int
+        _time: float
+        _count: int
+        _loop: Optional[AbstractEventLoop]
+        _ticker: Optional[LoopTimerHandle]
+
+    __slots__ = (
+        'resolution',
+        '_slots',
+        '_cursor',
+        '_time',
+        '_count',
+        '_loop',
+        '_ticker',
+    )
+
+    def __init__(self, resolution: float, slots: int = 512) -> None:
+        if resolution <= 0:
+            raise ValueError('resolution must be greater than 0')
+
+        self.resolution = resolution
+        self._slots = [set() for _ in range(slots)]
+        self._cursor = 0
+        self._time = 0.0
+        self._count = 0
+        self._loop = None
+        self._ticker = None
+
+    def __len__(self) -> int:
+        return self._count
+
+    def call_later(
+        self, delay: float, callback: Callable[..., Any], *args: Any
+    ) -> TimerHandle:
+        """Arrange for ``callback`` to be called with ``args`` after ``delay`` seconds.
+
+        Unlike :meth:`asyncio.loop.call_later`, this does not create an
+        event loop timer per call.
+        """
+        if self._ticker is None:
+            loop = self._loop = get_running_loop()
+            self._time = loop.time()
+            self._ticker = loop.call_at(self._time + self.resolution, self._tick)
+        else:
+            loop = self._loop
+            assert loop is not None
+
+        slot_count = len(self._slots)
+        ticks = max(1, ceil((loop.time() + delay - self._time) / self.resolution))
+        slot = (self._cursor + ticks) % slot_count
+
+        handle = TimerHandle(self, slot, (ticks - 1) // slot_count, callback, args)
+
+        self._slots[slot].add(handle)
+        self._count += 1
+
+        return handle
+
+    def close(self) -> None:
+        """Cancel every pending timer and stop ticking."""
+        for slot in self._slots:
+            for handle in slot:
+                handle._wheel = None
+
+            slot.clear()
+
+        self._count = 0
+
+        if self._ticker is not None:
+            self._ticker.cancel()
+            self._ticker = None
+
+    def _tick(self) -> None:
+        loop = self._loop
+        assert loop is not None
+
+        now = loop.time()
+        slots = self._slots
+        resolution = self.resolution
+        expired: List[TimerHandle] = []
+
+        # Catch up on every tick that is due, in case the loop was blocked.
+        # The first tick is always due, as the loop may call us marginally early.
+        while True:
+            self._time += resolution
+            self._cursor = (self._cursor + 1) % len(slots)
+
+            for handle in tuple(slots[self._cursor]):
+                if handle._rounds:
+                    handle._rounds -= 1
+                else:
+                    expired.append(handle)
+                    handle.cancel()
+
+            if self._time + resolution > now:
+                break
+
+        for handle in expired:
+            try:
+                handle._callback(*handle._args)
+            except Exception as exc:
+                loop.call_exception_handler(
+                    {
+                        'message': f'Exception in timer callback {handle._callback!r}',
+                        'exception': exc,
+                    }
+                )
+
+        if self._count:
+            self._ticker = loop.call_at(self._time + resolution, self._tick)
+        else:
+            self._ticker = None
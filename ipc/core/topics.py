@@ -0,0 +1,154 @@
+from __future__ import annotations
+
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from typing import (
+        Any,
+        Dict,
+        Hashable,
+        List,
+        Set,
+        Tuple,
+    )
+
+__all__ = (
+    'TopicTrie',
+    'validate_pattern',
+)
+
+# Keys of the protocol frames used to manage subscriptions
+SUBSCRIBE_KEY = '__ipc_subscribe__'
+UNSUBSCRIBE_KEY = '__ipc_unsubscribe__'
+PUBLISH_KEY = '__ipc_publish__'
+
+SEPARATOR = '.'
+SINGLE_WILDCARD = '*'
+MULTI_WILDCARD = '#'
+
+
+def validate_pattern(pattern: str) -> None:
+    """Raise :exc:`ValueError` if ``pattern`` is not a valid topic pattern.
+
+    Patterns are topic names made of ``.`` separated segments, where a ``*``
+    segment matches exactly one segment and a trailing ``#`` segment matches
+    zero or more segments.
+    """
+    if not isinstance(pattern, str):
+        raise TypeError(f'expected pattern to be str, not {pattern!r}')
+
+    segments = pattern.split(SEPARATOR)
+
+    if MULTI_WILDCARD in segments[:-1]:
+        raise ValueError(f'{MULTI_WILDCARD} may only be the last segment of {pattern!r}')
+
+
+class _Node:
+    if TYPE_CHECKING:
+        children: Dict[str, _Node]
+        subscribers: Set[Hashable]
+
+    __slots__ = (
+        'children',
+        'subscribers',
+    )
+
+    def __init__(self) -> None:
+        self.children = {}
+        self.subscribers = set()
+
+
+class TopicTrie:
+    """Maps topic patterns to subscribers, resolving wildcards by walking a trie.
+
+    Matching a topic costs time proportional to its number of segments
+    and the wildcards along the way, rather than to the number of patterns.
+    """
+
+    if TYPE_CHECKING:
+        _root: _Node
+
+    __slots__ = ('_root',)
+
+    def __init__(self) -> None:
+        self._root = _Node()
+
+    def add(self, pattern: str, subscriber: Hashable) -> None:
+        """Subscribe ``subscriber`` to topics matching ``pattern``.
+
+        Raises :exc:`ValueError` if the pattern is invalid.
+        """
+        validate_pattern(pattern)
+
+        node = self._root
+
+        for segment in pattern.split(SEPARATOR):
+            try:
+                child = node.children[segment]
+            except KeyError:
+                child = node.children[segment] = _Node()
+
+            node = child
+
+        node.subscribers.add(subscriber)
+
+    def remove(self, pattern: str, subscriber: Hashable) -> None:
+        """Unsubscribe ``subscriber`` from ``pattern``, pruning nodes left empty.
+
+        This method does nothing if ``subscriber`` is not subscribed to ``pattern``.
+        """
+        path: List[Tuple[_Node, str]] = []
+        node = self._root
+
+        for segment in pattern.split(SEPARATOR):
+            try:
+                child = node.children[segment]
+            except KeyError:
+                return
+
+            path.append((node, segment))
+            node = child
+
+        node.subscribers.discard(subscriber)
+
+        for parent, segment in reversed(path):
+            if node.subscribers or node.children:
+                break
+
+            del parent.children[segment]
+            node = parent
+
+    def match(self, topic: str) -> Set[Any]:
+        """Return the subscribers of every pattern matching ``topic``."""
+        segments = topic.split(SEPARATOR)
+        length = len(segments)
+        matched: Set[Any] = set()
+        stack = [(self._root, 0)]
+
+        while stack:
+            node, idx = stack.pop()
+            children = node.children
+
+            try:
+                matched.update(children[MULTI_WILDCARD].subscribers)
+            except KeyError:
+                pass
+
+            if idx == length:
+                matched.update(node.subscribers)
+                continue
+
+            try:
+                stack.append((children[segments[idx]], idx + 1))
+            except KeyError:
+                pass
+
+            try:
+                stack.append((children[SINGLE_WILDCARD], idx + 1))
+            except KeyError:
+                pass
+
+        return matched
+
+    def __bool__(self) -> bool:
+        return bool(self._root.children)
@@ -1,7 +1,10 @@
 from __future__ import annotations
 
 from sys import version_info
-from asyncio import get_running_loop
+from asyncio import (
+    TimeoutError,
+    get_running_loop,
+)
 from inspect import isawaitable
 from typing import TYPE_CHECKING
 
@@ -31,6 +34,7 @@ __all__ = (
     'json_dumps',
     'json_loads',
     'future',
+    'expire_future',
     'task',
     'maybe_awaitable',
     'NULL',
@@ -64,6 +68,16 @@ def future() -> Future[Any]:
     return get_running_loop().create_future()
 
 
+def expire_future(fut: Future[Any]) -> None:
+    """Set :exc:`asyncio.TimeoutError` on ``fut`` unless it is already done.
+
+    This is meant to be scheduled as a timer, so a future times out
+    without wrapping it in a task as :func:`asyncio.wait_for` does.
+    """
+    if not fut.done():
+        fut.set_exception(TimeoutError())
+
+
 def task(coro: Coroutine[Any, Any, T], name: str | None = None) -> Task[T]:
     create_task = get_running_loop().create_task
 
@@ -1,5 +1,9 @@
 from ipc.rpc import utils as utils
+from ipc.rpc.batching import *
+from ipc.rpc.cache import *
 from ipc.rpc.client import *
 from ipc.rpc.context import *
 from ipc.rpc.errors import *
+from ipc.rpc.pool import *
+from ipc.rpc.routing import *
 from ipc.rpc.server import *
@@ -0,0 +1,204 @@
+from __future__ import annotations
+
+from asyncio import TimeoutError
+from typing import TYPE_CHECKING
+
+from ipc.core.utils import future
+from ipc.rpc.errors import RpcError
+from ipc.rpc.utils import KIND_BATCH
+
+if TYPE_CHECKING:
+    from asyncio import Future
+    from types import TracebackType
+    from typing import (
+        Any,
+        Dict,
+        List,
+        Optional,
+        Sequence,
+        Type,
+        Union,
+    )
+    from typing_extensions import Self
+
+    from ipc.core.timer_wheel import TimerHandle
+    from ipc.rpc.client import Client
+    from ipc.rpc.types import (
+        CommandData,
+        CompactCommandData,
+    )
+
+
+class Batch:
+    """Collects command invocations to send to the server in a single frame.
+
+    This is returned by :meth:`rpc.Client.batch`.
+    """
+
+    if TYPE_CHECKING:
+        _client: Client
+        _ordered: bool
+        _commands: List[Union[CommandData, CompactCommandData]]
+        _futures: Dict[int, Future[Any]]
+        _sent: bool
+        _pending: int
+        _timer: Optional[TimerHandle]
+
+    __slots__ = (
+        '_client',
+        '_ordered',
+        '_commands',
+        '_futures',
+        '_sent',
+        '_pending',
+        '_timer',
+    )
+
+    def __init__(self, client: Client, *, ordered: bool = False) -> None:
+        self._client = client
+        self._ordered = ordered
+        self._commands = []
+        self._futures = {}
+        self._sent = False
+        self._pending = 0
+        self._timer = None
+
+    def __len__(self) -> int:
+        return len(self._commands)
+
+    async def __aenter__(self) -> Self:
+        return self
+
+    async def __aexit__(
+        self,
+        exc_tp: Optional[Type[BaseException]],
+        exc: Optional[BaseException],
+        tb: Optional[TracebackType],
+    ) -> None:
+        if exc_tp is None:
+            self.send()
+        else:
+            self.cancel()
+
+    def invoke(self, command: str, *args: Any) -> Future[Any]:
+        """Add a command invocation to this batch.
+
+        Returns a future that resolves to the command's return value
+        once the batch has been sent and the server has responded.
+
+        Parameters
+        ----------
+        command: :class:`str`
+            The name of the command you are attempting to invoke.
+        *args: Any
+            The arguments to pass to the command.
+        """
+        return self._add(command, args)
+
+    def _add(
+        self, command: str, args: Sequence[Any], deadline: Optional[float] = None
+    ) -> Future[Any]:
+        if self._sent:
+            raise RpcError('Batch has already been sent.')
+
+        client = self._client
+        nonce = client._nonce
+
+        client._nonce = nonce + 1
+
+        self._commands.append(client._build_command(command, nonce, args, deadline))
+
+        fut: Future[Any] = future()
+        client._response_waiters[nonce] = fut
+        self._futures[nonce] = fut
+
+        return fut
+
+    def send(self) -> None:
+        """Send every command added to this batch in a single frame.
+
+        This is called when the batch's context manager exits.
+        This method is idemponent.
+        """
+        if self._sent:
+            return
+
+        self._sent = True
+
+        if not self._commands:
+            return
+
+        client = self._client
+
+        try:
+            self._send_frame()
+        except BaseException:
+            self.cancel()
+            raise
+
+        timeout: Optional[float] = client.get_option('timeout')
+
+        client.next_options.clear()
+
+        if timeout is not None:
+            self._timer = client._timers.call_later(timeout, self._expire)
+            self._pending = len(self._futures)
+
+            # The timer is cancelled once every command has been responded to
+            for fut in self._futures.values():
+                fut.add_done_callback(self._future_done)
+
+    def _send_frame(self) -> None:
+        self._sent = True
+
+        if not self._commands:
+            return
+
+        client = self._client
+
+        if client._compact_negotiated:
+            client._send_protocol([KIND_BATCH, self._ordered, self._commands])
+            return
+
+        # Servers that didn't negotiate the compact format can't parse batches
+        for command in self._commands:
+            client.send(command)
+
+    def _fail(self, exc: BaseException) -> None:
+        """Set ``exc`` on the futures of every command that hasn't been responded to."""
+        self._sent = True
+
+        waiters = self._client._response_waiters
+
+        for nonce, fut in self._futures.items():
+            if not fut.done():
+                waiters.pop(nonce, None)
+                fut.set_exception(exc)
+
+    def cancel(self) -> None:
+        """Cancel the futures of every command that hasn't been responded to."""
+        self._sent = True
+
+        waiters = self._client._response_waiters
+
+        for nonce, fut in self._futures.items():
+            waiters.pop(nonce, None)
+            fut.cancel()
+
+    def _future_done(self, _: Future[Any]) -> None:
+        self._pending -= 1
+
+        if not self._pending and self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+
+    def _expire(self) -> None:
+        self._timer = None
+
+        client = self._client
+
+        for nonce, fut in self._futures.items():
+            if not fut.done():
+                client._send_cancel(nonce)
+
+        self._fail(TimeoutError())
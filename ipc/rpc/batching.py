@@ -0,0 +1,131 @@
+from __future__ import annotations
+
+from asyncio import get_running_loop
+from typing import (
+    TYPE_CHECKING,
+    NamedTuple,
+)
+
+from ipc.core.utils import (
+    future,
+    maybe_awaitable,
+    task,
+)
+from ipc.rpc.errors import CommandError
+
+if TYPE_CHECKING:
+    from asyncio import (
+        Future,
+        TimerHandle,
+    )
+    from typing import (
+        Any,
+        Callable,
+        List,
+        Optional,
+        Tuple,
+    )
+
+    from ipc.rpc.context import Context
+
+__all__ = ('BatchPolicy',)
+
+
+class BatchPolicy(NamedTuple):
+    """How a command registered with :meth:`rpc.Server.register` is batched.
+
+    Invocations of a batched command are collected, across every connection,
+    until ``max_size`` are pending or ``max_wait`` seconds have passed since
+    the first of them. The command is then called once with the contexts
+    and the argument tuples of every collected invocation, and must return
+    a list with one result per invocation, in the same order.
+
+    Parameters
+    ----------
+    max_size: :class:`int`
+        The maximum number of invocations per call.
+    max_wait: :class:`float`
+        The maximum number of seconds an invocation waits for others.
+
+    Examples
+    --------
+    Usage ::
+
+        @server.register(batch=rpc.BatchPolicy(max_size=64, max_wait=0.005))
+        async def score(ctxs, batch):
+            return model.predict(np.array([args for args in batch])).tolist()
+    """
+
+    max_size: int
+    max_wait: float
+
+
+class _Batcher:
+    """Collects the invocations of a single batched command."""
+
+    if TYPE_CHECKING:
+        func: Callable[..., Any]
+        policy: BatchPolicy
+        _pending: List[Tuple[Context, Future[Any]]]
+        _timer: Optional[TimerHandle]
+
+    __slots__ = (
+        'func',
+        'policy',
+        '_pending',
+        '_timer',
+    )
+
+    def __init__(self, func: Callable[..., Any], policy: BatchPolicy) -> None:
+        self.func = func
+        self.policy = policy
+        self._pending = []
+        self._timer = None
+
+    def submit(self, ctx: Context) -> Future[Any]:
+        """Add an invocation, returning a future that resolves to its result."""
+        fut: Future[Any] = future()
+        pending = self._pending
+
+        pending.append((ctx, fut))
+
+        if len(pending) >= self.policy.max_size:
+            self.flush()
+        elif self._timer is None:
+            self._timer = get_running_loop().call_later(self.policy.max_wait, self.flush)
+
+        return fut
+
+    def flush(self) -> None:
+        """Call the command with every pending invocation."""
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+
+        pending = self._pending
+
+        if pending:
+            self._pending = []
+            task(self._call(pending))
+
+    async def _call(self, pending: List[Tuple[Context, Future[Any]]]) -> None:
+        ctxs = [ctx for ctx, _ in pending]
+
+        try:
+            results = await maybe_awaitable(
+                self.func, ctxs, [tuple(ctx.args) for ctx in ctxs]
+            )
+
+            if len(results) != len(pending):
+                raise CommandError(
+                    f'Batched command returned {len(results)} results '
+                    f'for {len(pending)} invocations.'
+                )
+        except Exception as exc:
+            for _, fut in pending:
+                if not fut.done():
+                    fut.set_exception(exc)
+        else:
+            for (_, fut), result in zip(pending, results):
+                if not fut.done():
+                    fut.set_result(result)
@@ -0,0 +1,223 @@
+from __future__ import annotations
+
+from asyncio import shield
+from collections import OrderedDict
+from inspect import isasyncgen
+from time import monotonic
+from typing import (
+    TYPE_CHECKING,
+    NamedTuple,
+)
+
+from ipc.core.utils import (
+    NULL,
+    json_dumps,
+    task,
+)
+
+if TYPE_CHECKING:
+    from asyncio import Task
+    from typing import (
+        Any,
+        Dict,
+        Optional,
+        Sequence,
+        Tuple,
+    )
+
+    from ipc.rpc.context import Context
+
+    CacheKey = Tuple[str, bytes]
+
+__all__ = ('CachePolicy',)
+
+
+class CachePolicy(NamedTuple):
+    """How the results of a command registered with :meth:`rpc.Server.register` are cached.
+
+    Results are cached for ``ttl`` seconds by arguments, keeping at most
+    ``maxsize`` of them and evicting the least recently used. Concurrent
+    invocations with the same arguments, even from different connections,
+    share a single call to the command, which is passed the context of the
+    first of them. The call is cancelled once every invocation sharing it
+    is. A ``ttl`` of ``0`` only shares concurrent invocations.
+    Errors are never cached.
+
+    Parameters
+    ----------
+    ttl: :class:`float`
+        The number of seconds results are cached for.
+    maxsize: :class:`int`, default: 1024
+        The maximum number of cached results.
+
+    Examples
+    --------
+    Usage ::
+
+        @server.register(cache=rpc.CachePolicy(ttl=30))
+        async def search(ctx, query):
+            return await db.expensive_query(query)
+    """
+
+    ttl: float
+    maxsize: int = 1024
+
+
+def cache_key(command: str, args: Sequence[Any]) -> CacheKey:
+    """Return the key of the result of invoking ``command`` with ``args``.
+
+    Arguments are serialized, so unhashable ones such as lists can be part of it.
+    """
+    return command, json_dumps(list(args))
+
+
+class _ResultCache:
+    """Bounded LRU cache of command results, whose entries expire."""
+
+    if TYPE_CHECKING:
+        maxsize: int
+        generation: int
+        _entries: OrderedDict[CacheKey, Tuple[float, Any]]
+
+    __slots__ = (
+        'maxsize',
+        'generation',
+        '_entries',
+    )
+
+    def __init__(self, maxsize: int) -> None:
+        self.maxsize = maxsize
+        # Bumped on every invalidation, so results computed before one aren't cached
+        self.generation = 0
+        self._entries = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: CacheKey) -> Any:
+        """Return the cached result for ``key``, or ``NULL`` if there is none."""
+        entries = self._entries
+
+        try:
+            expires_at, value = entries[key]
+        except KeyError:
+            return NULL
+
+        if expires_at <= monotonic():
+            del entries[key]
+            return NULL
+
+        entries.move_to_end(key)
+
+        return value
+
+    def put(self, key: CacheKey, value: Any, ttl: float) -> None:
+        entries = self._entries
+
+        entries[key] = (monotonic() + ttl, value)
+        entries.move_to_end(key)
+
+        if len(entries) > self.maxsize:
+            entries.popitem(last=False)
+
+    def invalidate(self, command: str, args: Optional[Sequence[Any]] = None) -> None:
+        """Drop the result of ``command`` for ``args``, or every result
+        of ``command`` if ``args`` is ``None``.
+        """
+        self.generation += 1
+
+        entries = self._entries
+
+        if args is not None:
+            entries.pop(cache_key(command, args), None)
+            return
+
+        for key in [key for key in entries if key[0] == command]:
+            del entries[key]
+
+    def clear(self) -> None:
+        self.generation += 1
+        self._entries.clear()
+
+
+class _CommandCache:
+    """Caches the results of a single command registered with a :class:`CachePolicy`."""
+
+    if TYPE_CHECKING:
+        policy: CachePolicy
+        results: _ResultCache
+        _flights: Dict[CacheKey, Task[Any]]
+        _waiters: Dict[Task[Any], int]
+
+    __slots__ = (
+        'policy',
+        'results',
+        '_flights',
+        '_waiters',
+    )
+
+    def __init__(self, policy: CachePolicy) -> None:
+        self.policy = policy
+        self.results = _ResultCache(policy.maxsize)
+        self._flights = {}
+        # The number of invocations awaiting each flight
+        self._waiters = {}
+
+    async def call(self, ctx: Context) -> Any:
+        """Return the cached result for ``ctx``'s arguments, or else wait
+        for an identical invocation in flight, or else invoke ``ctx``.
+        """
+        key = cache_key(ctx.command_name, ctx.args)
+        value = self.results.get(key)
+
+        if value is not NULL:
+            return value
+
+        flight = self._flights.get(key)
+
+        if flight is None:
+            flight = self._flights[key] = task(
+                self._fly(ctx, key), name='py-ipc rpc cached command'
+            )
+            flight.add_done_callback(self._flight_done)
+
+        waiters = self._waiters
+        waiters[flight] = waiters.get(flight, 0) + 1
+
+        try:
+            # Shielded, so a cancelled invocation doesn't cancel the others
+            return await shield(flight)
+        finally:
+            count = waiters[flight] - 1
+
+            if count:
+                waiters[flight] = count
+            else:
+                del waiters[flight]
+
+                # Nobody is left to receive the result
+                if not flight.done():
+                    flight.cancel()
+
+    def _flight_done(self, flight: Task[Any]) -> None:
+        # Retrieved, so an error nobody was left to receive isn't logged as unhandled
+        if not flight.cancelled():
+            flight.exception()
+
+    async def _fly(self, ctx: Context, key: CacheKey) -> Any:
+        results = self.results
+        generation = results.generation
+
+        try:
+            value = await ctx._call()
+
+            # Every waiting context needs its own copy of the items
+            if isasyncgen(value):
+                value = [item async for item in value]
+        finally:
+            del self._flights[key]
+
+        if self.policy.ttl > 0 and results.generation == generation:
+            results.put(key, value, self.policy.ttl)
+
+        return value
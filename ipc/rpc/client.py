@@ -1,40 +1,194 @@
 from __future__ import annotations
 
-from asyncio import wait_for
-from typing import TYPE_CHECKING
+from asyncio import (
+    CancelledError,
+    TimeoutError,
+    get_running_loop,
+    shield,
+    sleep,
+)
+from heapq import (
+    heappop,
+    heappush,
+)
+from random import random
+from time import (
+    monotonic,
+    time,
+)
+from typing import (
+    TYPE_CHECKING,
+    NamedTuple,
+)
+from weakref import WeakKeyDictionary
 
 from ipc.core.client import Client as BaseClient
-from ipc.core.utils import cached_property, future
+from ipc.core.errors import NotConnected
+from ipc.core.timer_wheel import TimerWheel
+from ipc.core.utils import (
+    NULL,
+    cached_property,
+    expire_future,
+    future,
+    task,
+)
+from ipc.rpc.batch import Batch
+from ipc.rpc.cache import (
+    _ResultCache,
+    cache_key,
+)
 from ipc.rpc.client_commands import ClientCommands
-from ipc.rpc.errors import ServerError
-from ipc.rpc.utils import is_response
+from ipc.rpc.stream import (
+    Call,
+    Stream,
+)
+from ipc.rpc.errors import (
+    DEADLINE_EXCEEDED,
+    OVERLOADED,
+    DeadlineExceeded,
+    Overloaded,
+    RpcError,
+    ServerError,
+)
+from ipc.rpc.utils import (
+    COMMAND_IDS_KEY,
+    HELLO_KEY,
+    KIND_CANCEL,
+    KIND_COMMAND,
+    KIND_ERROR,
+    KIND_NOTIFY,
+    KIND_STREAM,
+    is_batch_result,
+    is_compact_response,
+    is_credit,
+    is_invalidate,
+    is_response,
+    is_stream_item,
+)
 
 if TYPE_CHECKING:
-    from asyncio import Future
+    from asyncio import (
+        AbstractEventLoop,
+        Future,
+        Handle,
+        Task,
+        Transport,
+    )
     from typing import (
         Any,
+        Coroutine,
         Dict,
+        List,
         Optional,
+        Sequence,
+        Tuple,
+        Type,
         TypeVar,
         Union,
+        overload,
+    )
+    from typing_extensions import (
+        Literal,
+        Self,
     )
-    from typing_extensions import Self
 
-    from ipc.rpc.types import CommandData, ResponseData
+    from ipc.rpc.pool import ClientPool
+    from ipc.rpc.types import (
+        CommandData,
+        CompactCommandData,
+        CompactResponseData,
+        ResponseData,
+    )
 
     T = TypeVar('T')
 
 
 __all__ = (
     'Client',
+    'QueueStats',
     'invoke',
 )
 
+# Exceptions raised for error responses carrying a specific code
+_ERRORS_BY_CODE: Dict[Optional[str], Type[ServerError]] = {
+    OVERLOADED: Overloaded,
+    DEADLINE_EXCEEDED: DeadlineExceeded,
+}
+
+
+def _unwrap_response(response: Union[ResponseData, CompactResponseData]) -> Any:
+    """Return the value of a command response, raising if it is an error."""
+    if isinstance(response, list):
+        # [kind, nonce, return value or error message, error code?]
+        if response[0] == KIND_ERROR:
+            code = response[3] if len(response) > 3 else None
+
+            raise _ERRORS_BY_CODE.get(code, ServerError)(response[2])
+
+        return response[2]
+
+    if 'error' in response:
+        raise _ERRORS_BY_CODE.get(response.get('code'), ServerError)(response['error'])
+
+    return response.get('return', None)
+
+
+# The pools used by invoke(), by event loop and address
+_shared_pools: WeakKeyDictionary[
+    AbstractEventLoop, Dict[Tuple[str, int], Task[ClientPool]]
+] = WeakKeyDictionary()
+
 
 async def invoke(host: str, port: int, command: str, *args: Any) -> Any:
-    client = Client(host, port)
-    await client.connect()
-    return await client.invoke(command, *args)
+    """Invoke a command on the :class:`rpc.Server` listening on ``host`` and ``port``.
+
+    The connection is kept open in a :class:`rpc.ClientPool` of size ``1``,
+    shared by every call made with the same address from the same event loop.
+
+    Examples
+    --------
+    Usage ::
+
+        resp = await rpc.invoke('localhost', 8000, 'foo', 123)
+    """
+    # Imported here, as the pool module imports this one
+    from ipc.rpc.pool import ClientPool
+
+    pools = _shared_pools.setdefault(get_running_loop(), {})
+    address = (host, port)
+    connecting = pools.get(address)
+
+    if connecting is None:
+        connecting = pools[address] = task(
+            ClientPool(host, port, size=1).connect(), name='py-ipc rpc shared pool'
+        )
+
+    try:
+        # Shielded, so a cancelled call doesn't fail the others sharing the pool
+        pool = await shield(connecting)
+    except Exception:
+        # Let the next call try again
+        if pools.get(address) is connecting:
+            del pools[address]
+
+        raise
+
+    return await pool.invoke(command, *args)
+
+
+class QueueStats(NamedTuple):
+    """A snapshot of the metrics of a :class:`rpc.Client`'s ``max_in_flight`` queue."""
+
+    depth: int
+    """The number of invocations waiting for a slot."""
+    in_flight: int
+    """The number of invocations holding a slot."""
+    acquired: int
+    """The number of slots acquired so far."""
+    mean_wait_time: float
+    """The mean number of seconds waited for a slot."""
+    max_wait_time: float
+    """The longest number of seconds waited for a slot."""
 
 
 class Client(BaseClient):
@@ -42,11 +196,93 @@ class Client(BaseClient):
     for rpc command invocation. This should be used to connect to a :class:`rpc.Server`.
     That being said, you can do anything with this client that you can do with a regular
     :class:`ipc.Client`.
+
+    Unless the ``compact`` option is set to ``False``, the client asks the server
+    for command IDs when it connects, with an ordinary message that servers
+    from before the compact format ignore. :meth:`.connect` waits up to
+    ``handshake_timeout`` seconds (``1`` by default) for the reply. Commands are
+    then sent as compact arrays rather than dicts, falling back to dicts for
+    commands the server has not assigned an ID to. Compact commands, batches
+    and their responses are sent as protocol frames, so they are never mistaken
+    for messages sent with :meth:`.send`.
+
+    If the server does not reply, every command is sent as a dict message, as
+    servers from before the compact format expect. Batches are then sent one
+    command at a time, which the server invokes concurrently even if they are
+    ordered, notifications are sent as commands whose response is discarded,
+    and commands are not cancelled on the server. Streams require the reply.
+
+    If the ``batch_window`` option is set, commands invoked within ``batch_window``
+    seconds of each other are sent together as a single batch, as with :meth:`.batch`.
+    A ``batch_window`` of ``0`` batches commands invoked in the same event loop
+    iteration. Batches are sent early once they reach ``max_batch_size`` commands,
+    which defaults to ``100``. ::
+
+        client = rpc.Client(..., batch_window=0.001, max_batch_size=50)
+
+        # These are sent in a single frame
+        await asyncio.gather(*(client.commands.get_user(id) for id in ids))
+
+    If the ``max_in_flight`` option is set, at most that many invocations await
+    a response at once. The others are queued locally, and are sent by ascending
+    ``priority`` option (``0`` by default), then in the order they were invoked.
+    The ``timeout`` option includes the time spent queued. ::
+
+        client = rpc.Client(..., max_in_flight=100)
+
+        # Jumps ahead of every queued invocation with the default priority
+        await client.set(priority=-1).invoke('health_check')
+
+        print(client.queue_stats())
+
+    If the ``timeout`` option is set, the time at which it elapses is sent along
+    with the command. The server discards the command rather than invoke it once
+    that time has passed, which :meth:`.invoke` raises as :exc:`DeadlineExceeded`,
+    and commands can read the time left with :meth:`rpc.Context.remaining`.
+    This relies on the clocks of the client and server being in sync.
+    Timeouts are checked every ``timeout_resolution`` seconds (``0.01`` by default),
+    so they may elapse up to that much later than set.
+
+    Results of the commands in the ``cacheable`` option, which maps their names
+    to a number of seconds, are cached for that long by command and arguments.
+    At most ``cache_size`` results (``1024`` by default) are kept, evicting the
+    least recently used. Cached results are returned as is, so they should not
+    be mutated. The server can drop them early with :meth:`rpc.Server.invalidate`. ::
+
+        client = rpc.Client(..., cacheable={'get_config': 5.0})
+
+    If the ``reconnect`` option is set, the client connects again when the
+    connection is lost, waiting a random delay of up to ``reconnect_delay``
+    seconds (``0.1`` by default), doubled after each failed attempt and capped
+    at ``max_reconnect_delay`` (``30`` by default). Invocations awaiting a
+    response when the connection is lost raise :exc:`NotConnected`, unless
+    the command is in the ``idempotent`` option and ``reconnect`` is set.
+    Those are sent again once reconnected. ::
+
+        client = rpc.Client(..., reconnect=True, idempotent={'get_user'})
     """
 
     if TYPE_CHECKING:
         _nonce: int
-        _response_waiters: Dict[int, Future[ResponseData]]
+        _response_waiters: Dict[int, Future[Any]]
+        _streams: Dict[int, Stream]
+        _cache: _ResultCache
+        _replays: Dict[int, Tuple[str, Sequence[Any], Optional[float]]]
+        _timers: TimerWheel
+        _reconnect_task: Optional[Task[None]]
+        _closing: bool
+        _command_ids: Dict[str, int]
+        _compact_negotiated: bool
+        _handshake: Optional[Future[None]]
+        _pending_batch: Optional[Batch]
+        _batch_timer: Optional[Handle]
+        _in_flight: int
+        _slot_queue: List[Tuple[int, int, Future[None]]]
+        _slot_seq: int
+        _slots_waiting: int
+        _slots_acquired: int
+        _slot_wait_time: float
+        _max_slot_wait_time: float
         options: Dict[str, Any]
         next_options: Dict[str, Any]
 
@@ -55,6 +291,26 @@ class Client(BaseClient):
 
         self._nonce = 0
         self._response_waiters = {}
+        self._streams = {}
+        self._cache = _ResultCache(kwargs.get('cache_size', 1024))
+        # Idempotent invocations awaiting a response, to send again after reconnecting
+        self._replays = {}
+        # Times out every invocation off a single loop timer
+        self._timers = TimerWheel(kwargs.get('timeout_resolution', 0.01))
+        self._reconnect_task = None
+        self._closing = False
+        self._command_ids = {}
+        self._compact_negotiated = False
+        self._handshake = None
+        self._pending_batch = None
+        self._batch_timer = None
+        self._in_flight = 0
+        self._slot_queue = []
+        self._slot_seq = 0
+        self._slots_waiting = 0
+        self._slots_acquired = 0
+        self._slot_wait_time = 0.0
+        self._max_slot_wait_time = 0.0
         self.options = kwargs.copy()
         self.next_options = {}
 
@@ -73,12 +329,30 @@ class Client(BaseClient):
         This method serves as a helper to resolve the future
         that :meth:`.invoke` is waiting on.
         """
-        if not is_response(data):
-            return
+        if is_response(data):
+            # If this fails, we have an unusable response.
+            # Would only happen if user messes with it.
+            self._resolve(data['nonce'], data)
+
+    def _resolve(
+        self, nonce: int, data: Union[ResponseData, CompactResponseData]
+    ) -> None:
+        stream = self._streams.pop(nonce, None)
+
+        if stream is not None:
+            # Streams closed early have already finished
+            if stream.done:
+                return
 
-        # If this fails, we have an unusable response.
-        # Would only happen if user messes with it.
-        nonce = data['nonce']
+            # The response of a streaming command marks the end of the stream
+            try:
+                result = _unwrap_response(data)
+            except ServerError as exc:
+                stream._finish(exc)
+            else:
+                stream._finish(result=result)
+
+            return
 
         try:
             fut = self._response_waiters.pop(nonce)
@@ -86,7 +360,10 @@ class Client(BaseClient):
             pass
         else:
             if not fut.done():
-                fut.set_result(data)
+                try:
+                    fut.set_result(_unwrap_response(data))
+                except ServerError as exc:
+                    fut.set_exception(exc)
 
                 # NOTE: Not sure about this event, might remove/update it
                 self.dispatch('response', data)
@@ -165,10 +442,590 @@ class Client(BaseClient):
 
             assert resp == [1, 2, 3]
         """
+        cacheable: Optional[Dict[str, float]] = self.get_option('cacheable')
+        ttl = cacheable.get(command) if cacheable else None
+
+        if ttl is None:
+            return await self._invoke(command, args)
+
+        cache = self._cache
+        key = cache_key(command, args)
+        value = cache.get(key)
+
+        if value is not NULL:
+            self.next_options.clear()
+            return value
+
+        generation = cache.generation
+        value = await self._invoke(command, args)
+
+        # The result may be stale if it was invalidated while it was awaited
+        if cache.generation == generation:
+            cache.put(key, value, ttl)
+
+        return value
+
+    async def _invoke(self, command: str, args: Sequence[Any]) -> Any:
+        timeout: Optional[float] = self.get_option('timeout')
+        batch_window: Optional[float] = self.get_option('batch_window')
+        max_in_flight: Optional[int] = self.get_option('max_in_flight')
+        idempotent = command in self.get_option('idempotent', ())
+        # Sent along so the server can skip commands nobody waits for anymore
+        deadline = time() + timeout if timeout is not None else None
+
+        if max_in_flight is not None:
+            priority: int = self.get_option('priority', 0)
+
+            # Other invocations may set options while this one is queued
+            self.next_options.clear()
+
+            started = monotonic()
+
+            await self._acquire_slot(max_in_flight, priority, timeout)
+
+            if timeout is not None:
+                timeout = max(0.0, timeout - (monotonic() - started))
+
+        try:
+            if batch_window is None:
+                nonce = self._nonce
+
+                self._nonce = nonce + 1
+
+                self._send_command(self._build_command(command, nonce, args, deadline))
+
+                fut: Future[Any] = future()
+                self._response_waiters[nonce] = fut
+            else:
+                if not self.connected:
+                    raise NotConnected('Connection is closed.')
+
+                # The batch uses the next nonce for this command
+                nonce = self._nonce
+                fut = self._add_to_pending_batch(command, args, batch_window, deadline)
+
+            self.next_options.clear()
+
+            if idempotent:
+                self._replays[nonce] = (command, args, deadline)
+
+            timer = (
+                self._timers.call_later(timeout, expire_future, fut)
+                if timeout is not None
+                else None
+            )
+
+            try:
+                return await fut
+            except (CancelledError, TimeoutError):
+                # Nobody will read the response, so the server can stop invoking it
+                if nonce in self._response_waiters:
+                    batch = self._pending_batch
+
+                    if batch is None or nonce not in batch._futures:
+                        self._send_cancel(nonce)
+
+                raise
+            finally:
+                if timer is not None:
+                    timer.cancel()
+
+                if nonce in self._response_waiters:
+                    del self._response_waiters[nonce]
+
+                if idempotent:
+                    del self._replays[nonce]
+        finally:
+            if max_in_flight is not None:
+                self._release_slot()
+
+    def stream(self, command: str, *args: Any) -> Stream:
+        """Invoke a command that is an asynchronous generator, returning an
+        asynchronous iterator over the items it yields.
+
+        The server only sends up to ``stream_window`` items (``32`` by default)
+        that have not been consumed yet, so a slow consumer pauses the command
+        rather than buffering its items. The stream of a command that is not
+        an asynchronous generator ends without any item.
+
+        A stream that is left before its end, e.g. by breaking out of the loop,
+        keeps the command paused until it is closed with :meth:`Stream.aclose`,
+        which cancels it. Using the stream as an asynchronous context manager
+        closes it when it exits.
+
+        Parameters
+        ----------
+        command: :class:`str`
+            The name of the command you are attempting to invoke.
+        *args: Any
+            The arguments to pass to the command.
+
+        Examples
+        --------
+        Usage ::
+
+            @server.register()
+            async def tail_logs(ctx, path):
+                async for line in follow(path):
+                    yield line
+
+            async for line in client.stream('tail_logs', '/var/log/app.log'):
+                print(line)
+
+            async with client.stream('tail_logs', '/var/log/app.log') as lines:
+                async for line in lines:
+                    if 'ERROR' in line:
+                        break
+        """
+        if not self.connected:
+            raise NotConnected('Connection is closed.')
+
+        self._ensure_compact()
+
+        window: int = self.get_option('stream_window', 32)
+
+        self.next_options.clear()
+
+        nonce = self._nonce
+
+        self._nonce = nonce + 1
+
+        stream = self._streams[nonce] = Stream(self, nonce, window)
+
+        self._send_protocol(
+            [
+                KIND_STREAM,
+                nonce,
+                self._command_ids.get(command, command),
+                list(args),
+                window,
+            ]
+        )
+
+        return stream
+
+    def open(self, command: str, *args: Any) -> Call:
+        """Invoke a command that consumes chunks sent with :meth:`Call.send`,
+        returning the :class:`Call`.
+
+        The command iterates over :attr:`rpc.Context.chunks` to receive them.
+        At most ``chunk_window`` chunks (``32`` by default) are buffered by the
+        server, so :meth:`Call.send` waits while a slow command catches up.
+        If the command is an asynchronous generator, its items are streamed back
+        as with :meth:`.stream`, and can be iterated over from the call.
+
+        Parameters
+        ----------
+        command: :class:`str`
+            The name of the command you are attempting to invoke.
+        *args: Any
+            The arguments to pass to the command.
+
+        Examples
+        --------
+        Usage ::
+
+            @server.register()
+            async def ingest(ctx, table):
+                count = 0
+
+                async for record in ctx.chunks:
+                    await db.insert(table, record)
+                    count += 1
+
+                return count
+
+            async with client.open('ingest', 'events') as call:
+                for record in records:
+                    await call.send(record)
+
+            print(await call.result())
+        """
+        if not self.connected:
+            raise NotConnected('Connection is closed.')
+
+        self._ensure_compact()
+
+        window: int = self.get_option('stream_window', 32)
+        chunk_window: int = self.get_option('chunk_window', 32)
+
+        self.next_options.clear()
+
         nonce = self._nonce
 
         self._nonce = nonce + 1
 
+        call = Call(self, nonce, window, chunk_window)
+        self._streams[nonce] = call
+
+        self._send_protocol(
+            [
+                KIND_STREAM,
+                nonce,
+                self._command_ids.get(command, command),
+                list(args),
+                window,
+                chunk_window,
+            ]
+        )
+
+        return call
+
+    def notify(self, command: str, *args: Any) -> None:
+        """Invoke a command without waiting for it, or for a response.
+
+        The server does not respond, so the return value of the command and
+        any error it raises are discarded. This saves allocating a nonce and
+        a future, and sending a response, for commands such as telemetry
+        whose return value nobody reads.
+
+        Parameters
+        ----------
+        command: :class:`str`
+            The name of the command you are attempting to invoke.
+        *args: Any
+            The arguments to pass to the command.
+
+        Examples
+        --------
+        Usage ::
+
+            client.notify('record_metric', 'requests', 1)
+        """
+        if not self.connected:
+            raise NotConnected('Connection is closed.')
+
+        self.next_options.clear()
+
+        if self._compact_negotiated:
+            self._send_protocol(
+                [KIND_NOTIFY, self._command_ids.get(command, command), list(args)]
+            )
+            return
+
+        # Nothing awaits the nonce, so the response is dropped when it arrives
+        nonce = self._nonce
+
+        self._nonce = nonce + 1
+
+        self.send(self._build_command(command, nonce, args))
+
+    @property
+    def pending(self) -> int:
+        """:class:`int`: The number of invocations and streams awaiting a response."""
+        return len(self._response_waiters) + len(self._streams)
+
+    @property
+    def in_flight(self) -> int:
+        """:class:`int`: The number of invocations holding a ``max_in_flight`` slot."""
+        return self._in_flight
+
+    def invalidate(self, command: str, args: Optional[Sequence[Any]] = None) -> Self:
+        """Drop cached results of a command marked as ``cacheable``.
+
+        This is called when :meth:`rpc.Server.invalidate` is.
+
+        Parameters
+        ----------
+        command: :class:`str`
+            The command name.
+        args: Optional[Sequence[Any]], default: None
+            The arguments the result was invoked with. If ``None``,
+            every result of the command is dropped.
+        """
+        self._cache.invalidate(command, args)
+
+        return self
+
+    if TYPE_CHECKING:
+
+        @overload
+        def connect(self, run_sync: Literal[True]) -> Self:
+            ...
+
+        @overload
+        def connect(self, run_sync: Literal[False] = ...) -> Coroutine[Any, Any, Self]:
+            ...
+
+    def connect(self, run_sync: bool = False) -> Any:
+        """Same as :meth:`ipc.Client.connect`, but the returned coroutine
+        also waits for the server to reply to the handshake, if the ``compact``
+        option is not set to ``False``.
+        """
+        if run_sync:
+            return super().connect(run_sync=True)
+
+        return self._connect()
+
+    async def close(self) -> Self:
+        """Close the connection, without reconnecting if ``reconnect`` is set."""
+        self._closing = True
+
+        reconnect_task = self._reconnect_task
+
+        if reconnect_task is not None:
+            reconnect_task.cancel()
+
+            # Waiting to be sent again, which they never will be
+            self._fail_waiters()
+
+        return await super().close()
+
+    def queue_stats(self) -> QueueStats:
+        """Return a snapshot of the ``max_in_flight`` queue's metrics."""
+        acquired = self._slots_acquired
+
+        return QueueStats(
+            depth=self._slots_waiting,
+            in_flight=self._in_flight,
+            acquired=acquired,
+            mean_wait_time=self._slot_wait_time / acquired if acquired else 0.0,
+            max_wait_time=self._max_slot_wait_time,
+        )
+
+    def batch(self, *, ordered: bool = False) -> Batch:
+        """Return an asynchronous context manager that sends every command
+        invoked through it in a single frame when it exits.
+
+        The server responds to every command in a single frame as well.
+        If the ``timeout`` option is set, it applies to the batch as a whole.
+
+        Parameters
+        ----------
+        ordered: :class:`bool`, default: False
+            Whether the server should invoke the commands one after the other,
+            in the order they were added, rather than concurrently.
+
+        Examples
+        --------
+        Usage ::
+
+            async with client.batch() as batch:
+                foo = batch.invoke('foo', 1)
+                bar = batch.invoke('bar', 2)
+
+            print(await foo, await bar)
+        """
+        return Batch(self, ordered=ordered)
+
+    # Internals
+
+    def _add_to_pending_batch(
+        self,
+        command: str,
+        args: Sequence[Any],
+        batch_window: float,
+        deadline: Optional[float] = None,
+    ) -> Future[Any]:
+        """Add a command to the batch that is automatically sent
+        after ``batch_window`` seconds, creating it if needed.
+        """
+        batch = self._pending_batch
+
+        if batch is None:
+            batch = self._pending_batch = Batch(self)
+            loop = get_running_loop()
+
+            if batch_window:
+                self._batch_timer = loop.call_later(
+                    batch_window, self._send_pending_batch
+                )
+            else:
+                self._batch_timer = loop.call_soon(self._send_pending_batch)
+
+        fut = batch._add(command, args, deadline)
+
+        if len(batch) >= self.get_option('max_batch_size', 100):
+            self._send_pending_batch()
+
+        return fut
+
+    async def _acquire_slot(
+        self, max_in_flight: int, priority: int, timeout: Optional[float]
+    ) -> None:
+        """Wait until fewer than ``max_in_flight`` invocations are in flight,
+        raising :exc:`asyncio.TimeoutError` after ``timeout`` seconds.
+
+        Waiting invocations are let through by ascending ``priority``,
+        and in the order they were queued within the same priority.
+        """
+        started = monotonic()
+
+        if self._in_flight < max_in_flight and not self._slots_waiting:
+            self._in_flight += 1
+        else:
+            waiter: Future[None] = future()
+
+            heappush(self._slot_queue, (priority, self._slot_seq, waiter))
+            self._slot_seq += 1
+            self._slots_waiting += 1
+
+            timer = (
+                self._timers.call_later(timeout, expire_future, waiter)
+                if timeout is not None
+                else None
+            )
+
+            try:
+                await waiter
+            except (CancelledError, TimeoutError):
+                if waiter.cancelled() or waiter.exception() is not None:
+                    # The entry stays in the queue until a release pops it
+                    self._slots_waiting -= 1
+                else:
+                    # The slot was handed over just as we were cancelled
+                    self._release_slot()
+
+                raise
+            finally:
+                if timer is not None:
+                    timer.cancel()
+
+        wait_time = monotonic() - started
+
+        self._slots_acquired += 1
+        self._slot_wait_time += wait_time
+        self._max_slot_wait_time = max(self._max_slot_wait_time, wait_time)
+
+    def _release_slot(self) -> None:
+        """Hand the slot of a finished invocation over to the next queued one."""
+        queue = self._slot_queue
+
+        while queue:
+            _, _, waiter = heappop(queue)
+
+            if not waiter.done():
+                self._slots_waiting -= 1
+                waiter.set_result(None)
+                return
+
+        self._in_flight -= 1
+
+    def _send_pending_batch(self) -> None:
+        batch = self._pending_batch
+
+        if batch is None:
+            return
+
+        self._pending_batch = None
+
+        if self._batch_timer is not None:
+            self._batch_timer.cancel()
+            self._batch_timer = None
+
+        try:
+            batch._send_frame()
+        except Exception as exc:
+            batch._fail(exc)
+
+    def _fail_waiters(self, *, keep_replays: bool = False) -> None:
+        """Raise :exc:`NotConnected` from the invocations awaiting a response,
+        except those to send again after reconnecting if ``keep_replays`` is ``True``.
+        """
+        waiters = self._response_waiters
+        replays = self._replays
+
+        for nonce in [
+            nonce for nonce in waiters if not (keep_replays and nonce in replays)
+        ]:
+            fut = waiters.pop(nonce)
+
+            if not fut.done():
+                fut.set_exception(NotConnected('Connection was lost.'))
+
+    async def _reconnect(self) -> None:
+        """Connect again after the connection was lost, waiting between attempts
+        with an exponential backoff, and send the idempotent invocations again.
+        """
+        base: float = self.options.get('reconnect_delay', 0.1)
+        max_delay: float = self.options.get('max_reconnect_delay', 30.0)
+        attempt = 0
+
+        try:
+            while not self.connected:
+                # Full jitter, so clients of a restarted server don't reconnect in lockstep
+                await sleep(min(max_delay, base * 2**attempt) * random())
+
+                try:
+                    await self.connect()
+                except OSError:
+                    attempt += 1
+        finally:
+            self._reconnect_task = None
+
+        waiters = self._response_waiters
+
+        for nonce, (command, args, deadline) in self._replays.items():
+            if nonce in waiters:
+                self._send_command(self._build_command(command, nonce, args, deadline))
+
+    def _send_cancel(self, nonce: int) -> None:
+        """Ask the server to cancel the command sent with ``nonce``."""
+        # Servers that didn't negotiate the compact format can't parse the frame
+        if self.connected and self._compact_negotiated:
+            self._send_protocol([KIND_CANCEL, nonce])
+
+    def _ensure_compact(self) -> None:
+        if not self._compact_negotiated:
+            raise RpcError('Server has not negotiated the compact format.')
+
+    async def _connect(self) -> Self:
+        await super().connect()
+        await self._wait_handshake()
+
+        return self
+
+    async def _wait_handshake(self) -> None:
+        """Wait until the server replies to the handshake, for at most
+        ``handshake_timeout`` seconds.
+        """
+        waiter = self._handshake
+
+        if waiter is None or waiter.done():
+            return
+
+        timeout: float = self.options.get('handshake_timeout', 1.0)
+        timer = self._timers.call_later(timeout, expire_future, waiter)
+
+        try:
+            await waiter
+        except TimeoutError:
+            # A server from before the compact format, which ignored the handshake
+            pass
+        finally:
+            timer.cancel()
+
+    def _finish_handshake(self) -> None:
+        waiter = self._handshake
+
+        if waiter is not None and not waiter.done():
+            waiter.set_result(None)
+
+    def _send_command(self, data: Union[CommandData, CompactCommandData]) -> None:
+        # Compact commands are protocol frames, so they can't be mistaken for user data
+        if isinstance(data, list):
+            self._send_protocol(data)
+        else:
+            self.send(data)
+
+    def _build_command(
+        self,
+        command: str,
+        nonce: int,
+        args: Sequence[Any],
+        deadline: Optional[float] = None,
+    ) -> Union[CommandData, CompactCommandData]:
+        """Build the message for a command invocation, in the compact
+        format if the server has assigned an ID to ``command``.
+        """
+        command_id = self._command_ids.get(command)
+
+        if command_id is not None:
+            if deadline is None:
+                return [KIND_COMMAND, nonce, command_id, list(args)]
+
+            return [KIND_COMMAND, nonce, command_id, list(args), deadline]
+
         data: CommandData = {
             '__rpc_command__': True,
             'command': command,
@@ -178,22 +1035,92 @@ class Client(BaseClient):
         if args:
             data['args'] = list(args)
 
-        self.send(data)
+        if deadline is not None:
+            data['deadline'] = deadline
 
-        fut: Future[ResponseData] = future()
-        self._response_waiters[nonce] = fut
+        return data
 
-        timeout: Optional[float] = self.get_option('timeout')
+    def _handle_protocol_message(self, message: Any) -> None:
+        if message.__class__ is dict and COMMAND_IDS_KEY in message:
+            command_ids = message[COMMAND_IDS_KEY]
 
-        self.next_options.clear()
+            if isinstance(command_ids, dict):
+                self._command_ids = command_ids
+                self._compact_negotiated = True
+                self._finish_handshake()
 
-        try:
-            response: ResponseData = await wait_for(fut, timeout=timeout)
-        finally:
-            if nonce in self._response_waiters:
-                del self._response_waiters[nonce]
+        elif is_batch_result(message):
+            for response in message[1]:
+                self._handle_protocol_response(response)
+
+        elif is_stream_item(message):
+            # [kind, nonce, item]
+            stream = self._streams.get(message[1])
+
+            if stream is not None:
+                stream._feed(message[2])
+
+        elif is_invalidate(message):
+            # [kind, command, args?]
+            self.invalidate(message[1], message[2] if len(message) > 2 else None)
+
+        elif is_credit(message):
+            # [kind, nonce, credit]
+            call = self._streams.get(message[1])
+
+            if isinstance(call, Call):
+                call._add_credit(message[2])
+
+        elif is_response(message) or is_compact_response(message):
+            self._handle_protocol_response(message)
+
+        else:
+            super()._handle_protocol_message(message)
+
+    def _handle_protocol_response(self, data: Any) -> None:
+        # Compact responses are only expected once the server has assigned command IDs
+        if is_compact_response(data):
+            # Streams are always responded to in the compact format
+            if self._compact_negotiated or data[1] in self._streams:
+                self._resolve(data[1], data)
+        else:
+            self.handle_response(data)
+
+    # Asyncio callbacks
+
+    def _protocol_cb_connection_made(self, transport: Transport) -> None:
+        # Command IDs are only valid for the server that assigned them
+        self._command_ids = {}
+        self._compact_negotiated = False
+        self._closing = False
+
+        super()._protocol_cb_connection_made(transport)
+
+        if self.options.get('compact', True):
+            # Not a protocol frame yet, as servers from before them can't parse it
+            self._handshake = future()
+            self.send({HELLO_KEY: 1})
+
+    def _protocol_cb_connection_lost(self, exc: Optional[Exception]) -> None:
+        self._finish_handshake()
+
+        # Invalidations sent while disconnected would be missed
+        self._cache.clear()
+
+        streams = self._streams
+
+        if streams:
+            self._streams = {}
+
+            for stream in streams.values():
+                stream._finish(NotConnected('Connection is closed.'))
+
+        reconnect = self.options.get('reconnect', False) and not self._closing
+
+        # Fail fast, rather than leave invocations waiting for their timeout
+        self._fail_waiters(keep_replays=reconnect)
 
-        if 'error' in response:
-            raise ServerError(response['error'])
+        if reconnect and self._reconnect_task is None:
+            self._reconnect_task = task(self._reconnect(), name='py-ipc rpc reconnect')
 
-        return response.get('return', None)
+        return super()._protocol_cb_connection_lost(exc)
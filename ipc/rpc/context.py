@@ -1,22 +1,48 @@
 from __future__ import annotations
 
+from asyncio import (
+    CancelledError,
+    current_task,
+)
+from inspect import isasyncgen
+from time import time
 from typing import (
     TYPE_CHECKING,
     TypeVar,
 )
 
-from ipc.core.utils import maybe_awaitable
+from ipc.core.utils import (
+    future,
+    maybe_awaitable,
+)
 from ipc.rpc.errors import (
+    CANCELLED,
+    CommandCancelled,
     CommandError,
     CommandInvokeError,
     CommandNotFound,
 )
+from ipc.rpc.stream import Stream
+from ipc.rpc.utils import (
+    KIND_COMMAND,
+    KIND_ERROR,
+    KIND_NOTIFY,
+    KIND_RETURN,
+    KIND_STREAM,
+    KIND_STREAM_ITEM,
+)
 
 if TYPE_CHECKING:
+    from asyncio import (
+        Future,
+        Task,
+    )
     from typing import (
         Any,
+        AsyncGenerator,
         List,
         Optional,
+        Union,
     )
     from typing_extensions import Self
 
@@ -25,6 +51,9 @@ if TYPE_CHECKING:
     from ipc.rpc.types import (
         CommandData,
         CommandFunc,
+        CompactCommandData,
+        CompactResponseData,
+        NotificationData,
         ResponseData,
     )
 
@@ -37,23 +66,74 @@ class Context:
         args: List[str]
         command: Optional[CommandFunc]
         error: Optional[CommandError]
+        deadline: Optional[float]
+        compact: bool
+        notification: bool
         _responded: bool
+        _responses: Optional[List[Any]]
+        streaming: bool
+        chunks: Optional[Stream]
+        _task: Optional[Task[Any]]
+        _cancelled: bool
+        _credit: int
+        _credit_waiter: Optional[Future[None]]
 
     error = None
+    # The time.time() at which the client stops waiting for the response
+    deadline = None
+    # Set for commands sent with rpc.Client.notify(), which nobody awaits a response to
+    notification = False
     _responded = False
+    # Set when invoked as part of a batch, to collect the response instead of sending it
+    _responses = None
+    streaming = False
+    chunks = None
+    _task = None
+    _cancelled = False
+    _credit = 0
+    _credit_waiter = None
 
     def __init__(
         self,
         server: Server,
         connection: Connection,
-        data: CommandData,
+        data: Union[CommandData, CompactCommandData, NotificationData],
     ) -> None:
         self.connection = connection
         self.server = server
-        self._nonce = data['nonce']
-        self.args = data.get('args', [])
-        self.command_name = data['command']
-        self.command = self.server.commands.get(self.command_name)
+
+        if isinstance(data, list) and data[0] == KIND_NOTIFY:
+            # [kind, command id or name, args]
+            self.compact = True
+            self.notification = True
+            self._nonce = -1
+            self.args = data[2]
+            self.command_name = server._command_names.get(data[1], str(data[1]))
+        elif isinstance(data, list):
+            # [kind, nonce, command id, args, deadline?]
+            self.compact = True
+            self._nonce = data[1]
+            self.args = data[3]
+            self.command_name = server._command_names.get(data[2], str(data[2]))
+
+            if data[0] == KIND_COMMAND and len(data) > 4:
+                self.deadline = data[4]
+
+            if data[0] == KIND_STREAM:
+                # [kind, nonce, command id or name, args, credit, chunk credit?]
+                self.streaming = True
+                self._credit = data[4]
+
+                if len(data) > 5:
+                    self.chunks = Stream(connection, self._nonce, data[5])
+        else:
+            self.compact = False
+            self._nonce = data['nonce']
+            self.args = data.get('args', [])
+            self.command_name = data['command']
+            self.deadline = data.get('deadline')
+
+        self.command = server.commands.get(self.command_name)
 
     async def __aenter__(self):
         return self
@@ -63,22 +143,72 @@ class Context:
 
         return self
 
+    def remaining(self) -> Optional[float]:
+        """Return the number of seconds left before the client stops waiting
+        for the response, or ``None`` if it invoked the command without a timeout.
+
+        Pass this on as the ``timeout`` of nested invocations, so they are
+        not waited for longer than the response to this one is.
+
+        Examples
+        --------
+        Usage ::
+
+            @server.register()
+            async def get_profile(ctx, user_id):
+                return await users.set(timeout=ctx.remaining()).invoke('get_user', user_id)
+        """
+        deadline = self.deadline
+
+        if deadline is None:
+            return None
+
+        return max(0.0, deadline - time())
+
     async def invoke(self) -> None:
         self.server.dispatch('command', self)
 
         command = self.command
+        self._task = current_task()
 
         try:
             if command is None:
                 raise CommandNotFound(self.command_name)
 
-            ret = await maybe_awaitable(command, self, *self.args)
+            cache = self.server._caches.get(self.command_name)
+
+            # Streams can't be shared, and depend on chunks sent for this invocation only
+            if cache is not None and not self.streaming:
+                ret = await cache.call(self)
+            else:
+                ret = await self._call()
+
+            if isasyncgen(ret):
+                ret = await self._stream(ret)
 
             if not self._responded:
                 self.respond(ret)
 
             self.server.dispatch('command_success', self)
 
+        except CancelledError:
+            # Only cancellations requested by the client are handled here
+            if not self._cancelled:
+                raise
+
+            uncancel = getattr(self._task, 'uncancel', None)
+
+            if uncancel is not None:
+                uncancel()
+
+            self.error = CommandCancelled(self.command_name)
+
+            # Lets the client forget the nonce, e.g. for streams
+            if not self._responded:
+                self.respond(str(self.error), error=True, code=CANCELLED)
+
+            self.server.dispatch('command_cancelled', self)
+
         except Exception as exc:
             if not isinstance(exc, CommandError):
                 exc = CommandInvokeError(exc)
@@ -87,22 +217,118 @@ class Context:
 
             self.server.dispatch('command_error', self)
 
-    def respond(self, data: Any, error: bool = False) -> Self:
+    async def _call(self) -> Any:
+        """Call the command, through its batcher if it is batched."""
+        batcher = self.server._batchers.get(self.command_name)
+
+        if batcher is not None:
+            return await batcher.submit(self)
+
+        command = self.command
+
+        assert command is not None
+
+        return await maybe_awaitable(command, self, *self.args)
+
+    def _cancel(self) -> None:
+        """Cancel the task invoking the command, as the client stopped waiting for it."""
+        task = self._task
+
+        if task is not None and not self._cancelled:
+            self._cancelled = True
+            task.cancel()
+
+    async def _stream(self, gen: AsyncGenerator[Any, Any]) -> Any:
+        """Send every item ``gen`` yields, if the client asked for a stream with
+        :meth:`rpc.Client.stream`, or return them all as a list otherwise.
+
+        An item is only sent while the client has credit left, so a slow
+        consumer pauses the generator rather than buffering items.
+        """
+        if not self.streaming:
+            return [item async for item in gen]
+
+        connection = self.connection
+
+        try:
+            while True:
+                # Wait before asking for the next item, so none is produced without credit
+                if not self._credit:
+                    await self._wait_credit()
+
+                if not connection.connected:
+                    break
+
+                try:
+                    item = await gen.__anext__()
+                except StopAsyncIteration:
+                    break
+
+                self._credit -= 1
+                connection._send_protocol([KIND_STREAM_ITEM, self._nonce, item])
+        finally:
+            await gen.aclose()
+
+    async def _wait_credit(self) -> None:
+        """Wait until the client grants credit or the connection is lost."""
+        waiter = self._credit_waiter = future()
+
+        try:
+            await waiter
+        finally:
+            self._credit_waiter = None
+
+    def _add_credit(self, credit: int) -> None:
+        self._credit += credit
+        self._wake_credit_waiter()
+
+    def _wake_credit_waiter(self) -> None:
+        waiter = self._credit_waiter
+
+        if waiter is not None and not waiter.done():
+            waiter.set_result(None)
+
+    def respond(
+        self, data: Any, error: bool = False, *, code: Optional[str] = None
+    ) -> Self:
         if self._responded:
             raise CommandError('Context has already been responded to.')
 
-        response: ResponseData = {
-            'nonce': self._nonce,
-            '__rpc_response__': True,
-        }
+        if self.notification:
+            # Nobody awaits the response
+            self._responded = True
+            return self
 
-        if error:
-            response['error'] = data
+        response: Union[ResponseData, CompactResponseData]
+
+        if self.compact:
+            if not error:
+                response = [KIND_RETURN, self._nonce, data]
+            elif code is None:
+                response = [KIND_ERROR, self._nonce, data]
+            else:
+                response = [KIND_ERROR, self._nonce, data, code]
         else:
-            response['return'] = data
+            response = {
+                'nonce': self._nonce,
+                '__rpc_response__': True,
+            }
+
+            if error:
+                response['error'] = data
+
+                if code is not None:
+                    response['code'] = code
+            else:
+                response['return'] = data
 
-        if self.connection.connected:
-            self.connection.send(response)
+        if self._responses is not None:
+            self._responses.append(response)
+        elif self.connection.connected:
+            if self.compact:
+                self.connection._send_protocol(response)
+            else:
+                self.connection.send(response)
 
         self._responded = True
 
@@ -7,8 +7,16 @@ from ipc.core.errors import IpcError
 __all__ = (
     'RpcError',
     'CommandAlreadyRegistered',
+    'Overloaded',
+    'CommandCancelled',
+    'DeadlineExceeded',
 )
 
+# Codes sent in error responses, which the client raises specific exceptions for
+OVERLOADED = 'overloaded'
+CANCELLED = 'cancelled'
+DEADLINE_EXCEEDED = 'deadline_exceeded'
+
 
 class RpcError(IpcError):
     pass
@@ -37,6 +45,18 @@ class ServerError(CommandError):
     pass
 
 
+class Overloaded(ServerError):
+    """Raised by :meth:`rpc.Client.invoke` when the server shed the command
+    because it was above its admission limits.
+    """
+
+
+class DeadlineExceeded(ServerError):
+    """Raised by :meth:`rpc.Client.invoke` when the server discarded the command
+    because its ``timeout`` had already elapsed when it was about to be invoked.
+    """
+
+
 class CommandNotFound(CommandError):
     if TYPE_CHECKING:
         command_name: str
@@ -47,3 +67,19 @@ class CommandNotFound(CommandError):
         super().__init__(
             f'Command {command_name} not found.',
         )
+
+
+class CommandCancelled(CommandError):
+    """Set as :attr:`rpc.Context.error` when the client cancelled the command,
+    because it timed out or stopped waiting for the response.
+    """
+
+    if TYPE_CHECKING:
+        command_name: str
+
+    def __init__(self, command_name: str) -> None:
+        self.command_name = command_name
+
+        super().__init__(
+            f'Command {command_name} was cancelled.',
+        )
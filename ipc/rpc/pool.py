@@ -0,0 +1,234 @@
+from __future__ import annotations
+
+from asyncio import (
+    CancelledError,
+    gather,
+    shield,
+    sleep,
+)
+from typing import TYPE_CHECKING
+
+from ipc.core.errors import NotConnected
+from ipc.core.utils import task
+from ipc.rpc.client import Client
+
+if TYPE_CHECKING:
+    from asyncio import Task
+    from types import TracebackType
+    from typing import (
+        Any,
+        Dict,
+        List,
+        Optional,
+        Type,
+    )
+    from typing_extensions import Self
+
+    from ipc.rpc.stream import Stream
+
+__all__ = ('ClientPool',)
+
+
+class ClientPool:
+    """Keeps several :class:`rpc.Client` connections to a server open,
+    and sends each invocation over the one with the fewest awaiting a response.
+
+    Connections that are lost are replaced in the background, retrying every
+    ``retry_interval`` seconds until the server can be reached again.
+    Meanwhile, invocations are sent over the remaining connections.
+
+    Parameters
+    ----------
+    host: :class:`str`
+        The server's host.
+    port: :class:`int`
+        The server's port.
+    size: :class:`int`, default: 4
+        The number of connections to keep open.
+    retry_interval: :class:`float`, default: 1.0
+        The number of seconds to wait between attempts to replace a lost connection.
+    **options: Any
+        The options of every :class:`rpc.Client`.
+
+    Examples
+    --------
+    Usage ::
+
+        async with rpc.ClientPool('localhost', 8000, size=8) as pool:
+            await asyncio.gather(*(pool.invoke('get_user', id) for id in ids))
+    """
+
+    if TYPE_CHECKING:
+        host: str
+        port: int
+        size: int
+        retry_interval: float
+        options: Dict[str, Any]
+        next_options: Dict[str, Any]
+        _clients: List[Client]
+        _watchers: List[Task[None]]
+
+    __slots__ = (
+        'host',
+        'port',
+        'size',
+        'retry_interval',
+        'options',
+        'next_options',
+        '_clients',
+        '_watchers',
+    )
+
+    def __init__(
+        self,
+        host: str,
+        port: int,
+        size: int = 4,
+        *,
+        retry_interval: float = 1.0,
+        **options: Any,
+    ) -> None:
+        self.host = host
+        self.port = port
+        self.size = size
+        self.retry_interval = retry_interval
+        self.options = options
+        self.next_options = {}
+        self._clients = []
+        self._watchers = []
+
+    def __repr__(self) -> str:
+        return (
+            f'<{type(self).__name__} host={self.host} '
+            f'port={self.port} size={self.size}>'
+        )
+
+    async def __aenter__(self) -> Self:
+        return await self.connect()
+
+    async def __aexit__(
+        self,
+        exc_tp: Optional[Type[BaseException]],
+        exc: Optional[BaseException],
+        tb: Optional[TracebackType],
+    ) -> None:
+        await self.close()
+
+    async def connect(self) -> Self:
+        """Open every connection.
+
+        If any of them can't be opened, the others are closed and the error is raised.
+        """
+        clients = [self._new_client() for _ in range(self.size)]
+        results = await gather(
+            *(client.connect() for client in clients), return_exceptions=True
+        )
+
+        for result in results:
+            if isinstance(result, BaseException):
+                await gather(*(client.close() for client in clients))
+                raise result
+
+        self._clients = clients
+        self._watchers = [
+            task(self._watch(index), name='py-ipc rpc pool watcher')
+            for index in range(self.size)
+        ]
+
+        return self
+
+    async def close(self) -> Self:
+        """Close every connection, and stop replacing lost ones."""
+        for watcher in self._watchers:
+            watcher.cancel()
+
+        self._watchers = []
+
+        await gather(*(client.close() for client in self._clients))
+
+        return self
+
+    @property
+    def clients(self) -> List[Client]:
+        """List[:class:`rpc.Client`]: The clients of this pool, including disconnected ones."""
+        return self._clients.copy()
+
+    def get_client(self) -> Client:
+        """Return the connected client with the fewest invocations awaiting a response.
+
+        Raises :exc:`NotConnected` if every connection is being replaced.
+        """
+        best: Optional[Client] = None
+
+        for client in self._clients:
+            if client.connected and (best is None or client.pending < best.pending):
+                best = client
+
+        if best is None:
+            raise NotConnected('No connection is open.')
+
+        return best
+
+    def set(self, **kwargs: Any) -> Self:
+        """Update custom options for the next command invocation,
+        as with :meth:`rpc.Client.set`.
+        """
+        self.next_options.update(**kwargs)
+
+        return self
+
+    async def invoke(self, command: str, *args: Any) -> Any:
+        """Invoke a command with :meth:`rpc.Client.invoke`
+        over the least loaded connection.
+        """
+        return await self._next_client().invoke(command, *args)
+
+    def stream(self, command: str, *args: Any) -> Stream:
+        """Invoke a command with :meth:`rpc.Client.stream`
+        over the least loaded connection.
+        """
+        return self._next_client().stream(command, *args)
+
+    # Internals
+
+    def _new_client(self) -> Client:
+        return Client(self.host, self.port, **self.options)
+
+    def _next_client(self) -> Client:
+        client = self.get_client()
+        next_options = self.next_options
+
+        if next_options:
+            client.set(**next_options)
+            next_options.clear()
+
+        return client
+
+    async def _watch(self, index: int) -> None:
+        """Replace the client at ``index`` whenever its connection is lost."""
+        clients = self._clients
+        client = clients[index]
+
+        try:
+            while True:
+                if client.connected:
+                    # Shielded, as the future is shared with the client
+                    await shield(client._wait_closed())
+
+                while True:
+                    client = self._new_client()
+
+                    try:
+                        await client.connect()
+                    except OSError:
+                        await sleep(self.retry_interval)
+                    else:
+                        break
+
+                clients[index] = client
+        except CancelledError:
+            # The pool was closed while a replacement was connecting
+            if client is not clients[index]:
+                await client.close()
+
+            raise
@@ -0,0 +1,466 @@
+from __future__ import annotations
+
+from asyncio import (
+    FIRST_COMPLETED,
+    gather,
+    wait,
+)
+from bisect import (
+    bisect,
+    insort,
+)
+from collections import deque
+from hashlib import md5
+from math import ceil
+from time import monotonic
+from typing import TYPE_CHECKING
+
+from ipc.core.errors import NotConnected
+from ipc.core.utils import (
+    json_dumps,
+    task,
+)
+from ipc.rpc.client import Client
+
+if TYPE_CHECKING:
+    from asyncio import Task
+    from types import TracebackType
+    from typing import (
+        Any,
+        Deque,
+        Dict,
+        Iterable,
+        Iterator,
+        List,
+        Optional,
+        Sequence,
+        Tuple,
+        Type,
+    )
+    from typing_extensions import (
+        Literal,
+        Self,
+    )
+
+    Routing = Literal['hash', 'round_robin', 'least_latency']
+
+__all__ = (
+    'HashRing',
+    'MultiClient',
+)
+
+# The weight of the latest latency in the moving average of an endpoint
+_LATENCY_SMOOTHING = 0.2
+# The number of recent response times the hedging delay is computed from
+_LATENCY_SAMPLES = 256
+# Invocations aren't hedged until this many response times are known
+_MIN_HEDGE_SAMPLES = 20
+# The hedging delay is recomputed once this many response times have been recorded
+_HEDGE_DELAY_REFRESH = 16
+
+
+def _hash(data: bytes) -> int:
+    return int.from_bytes(md5(data).digest()[:8], 'big')
+
+
+class HashRing:
+    """A consistent-hash ring mapping keys to nodes.
+
+    Each node is placed on the ring ``replicas`` times, and a key belongs to
+    the first node found clockwise from its own position. Adding or removing
+    a node only moves the keys of that node.
+
+    Parameters
+    ----------
+    nodes: Iterable[:class:`str`]
+        The initial nodes.
+    replicas: :class:`int`, default: 64
+        The number of times each node is placed on the ring.
+    """
+
+    if TYPE_CHECKING:
+        replicas: int
+        _positions: List[int]
+        _nodes: Dict[int, str]
+
+    __slots__ = (
+        'replicas',
+        '_positions',
+        '_nodes',
+    )
+
+    def __init__(self, nodes: Iterable[str] = (), *, replicas: int = 64) -> None:
+        self.replicas = replicas
+        self._positions = []
+        self._nodes = {}
+
+        for node in nodes:
+            self.add(node)
+
+    def __len__(self) -> int:
+        return len(set(self._nodes.values()))
+
+    def add(self, node: str) -> Self:
+        """Place ``node`` on the ring."""
+        for i in range(self.replicas):
+            position = _hash(f'{node}#{i}'.encode())
+
+            if position not in self._nodes:
+                self._nodes[position] = node
+                insort(self._positions, position)
+
+        return self
+
+    def remove(self, node: str) -> Self:
+        """Remove ``node`` from the ring."""
+        positions = [position for position, n in self._nodes.items() if n == node]
+
+        for position in positions:
+            del self._nodes[position]
+
+        self._positions = sorted(self._nodes)
+
+        return self
+
+    def get(self, key: Any) -> str:
+        """Return the node ``key`` belongs to.
+
+        ``key`` must be JSON serializable. Raises :exc:`LookupError` if the ring is empty.
+        """
+        for node in self.iter_nodes(key):
+            return node
+
+        raise LookupError('Hash ring is empty.')
+
+    def iter_nodes(self, key: Any) -> Iterator[str]:
+        """Iterate over every node, starting with the one ``key`` belongs to
+        and going clockwise, which is the order to fall back in.
+        """
+        positions = self._positions
+
+        if not positions:
+            return
+
+        nodes = self._nodes
+        start = bisect(positions, _hash(json_dumps(key)))
+        seen = set()
+        count = len(positions)
+
+        for i in range(count):
+            node = nodes[positions[(start + i) % count]]
+
+            if node not in seen:
+                seen.add(node)
+                yield node
+
+
+class MultiClient:
+    """Invokes commands on several :class:`rpc.Server` endpoints, routing each
+    invocation to one of them.
+
+    With ``'hash'`` routing, invocations are routed by the ``key`` option,
+    or their first argument if it is not set, on a :class:`HashRing`, so the
+    same key always goes to the same endpoint while it is connected. With
+    ``'round_robin'`` routing, endpoints take turns. With ``'least_latency'``
+    routing, invocations go to the endpoint with the lowest moving average
+    of response times.
+
+    Endpoints that are disconnected are skipped, in favour of the next one
+    in routing order. Invocations that lose their connection while awaiting
+    a response are rerouted too if the command is in the ``idempotent`` option,
+    and raise :exc:`NotConnected` otherwise. Unless the ``reconnect`` option
+    is set to ``False``, lost endpoints are reconnected in the background
+    as with :class:`rpc.Client`, and routed to again once they are.
+
+    If the ``hedge`` option is set, invocations of commands in the ``idempotent``
+    option that take longer than 95% of recent ones are sent again to the next
+    endpoint in routing order. The first response is returned, and the other
+    invocation is cancelled. This cuts the latency added by a slow server
+    at the cost of a few duplicate invocations. ::
+
+        client = rpc.MultiClient(endpoints, hedge=True, idempotent={'get_user'})
+
+    Parameters
+    ----------
+    endpoints: Sequence[Tuple[:class:`str`, :class:`int`]]
+        The host and port of every server.
+    routing: :class:`str`, default: 'hash'
+        One of ``'hash'``, ``'round_robin'`` or ``'least_latency'``.
+    **options: Any
+        The options of every :class:`rpc.Client`.
+
+    Examples
+    --------
+    Usage ::
+
+        client = rpc.MultiClient([('localhost', 8000), ('localhost', 8001)])
+
+        async with client:
+            # Always handled by the same server
+            await client.invoke('add_to_cart', user_id, item)
+            await client.set(key=user_id).invoke('checkout')
+    """
+
+    if TYPE_CHECKING:
+        routing: Routing
+        options: Dict[str, Any]
+        next_options: Dict[str, Any]
+        _clients: Dict[str, Client]
+        _ring: HashRing
+        _latencies: Dict[str, float]
+        _samples: Deque[float]
+        _new_samples: int
+        _cached_hedge_delay: Optional[float]
+        _turn: int
+
+    __slots__ = (
+        'routing',
+        'options',
+        'next_options',
+        '_clients',
+        '_ring',
+        '_latencies',
+        '_samples',
+        '_new_samples',
+        '_cached_hedge_delay',
+        '_turn',
+    )
+
+    def __init__(
+        self,
+        endpoints: Sequence[Tuple[str, int]],
+        *,
+        routing: Routing = 'hash',
+        **options: Any,
+    ) -> None:
+        if routing not in ('hash', 'round_robin', 'least_latency'):
+            raise ValueError(f'Unknown routing {routing!r}.')
+
+        options.setdefault('reconnect', True)
+
+        self.routing = routing
+        self.options = options
+        self.next_options = {}
+        # Idempotent invocations are rerouted here, rather than replayed by the endpoint
+        client_options = {k: v for k, v in options.items() if k != 'idempotent'}
+        self._clients = {
+            f'{host}:{port}': Client(host, port, **client_options)
+            for host, port in endpoints
+        }
+        self._ring = HashRing(self._clients)
+        self._latencies = dict.fromkeys(self._clients, 0.0)
+        self._samples = deque(maxlen=_LATENCY_SAMPLES)
+        # The number of response times recorded since the hedging delay was computed
+        self._new_samples = 0
+        self._cached_hedge_delay = None
+        self._turn = 0
+
+    def __repr__(self) -> str:
+        return f'<{type(self).__name__} endpoints={list(self._clients)} routing={self.routing}>'
+
+    async def __aenter__(self) -> Self:
+        return await self.connect()
+
+    async def __aexit__(
+        self,
+        exc_tp: Optional[Type[BaseException]],
+        exc: Optional[BaseException],
+        tb: Optional[TracebackType],
+    ) -> None:
+        await self.close()
+
+    async def connect(self) -> Self:
+        """Connect to every endpoint."""
+        await gather(*(client.connect() for client in self._clients.values()))
+
+        return self
+
+    async def close(self) -> Self:
+        """Close the connection to every endpoint."""
+        await gather(*(client.close() for client in self._clients.values()))
+
+        return self
+
+    @property
+    def clients(self) -> Dict[str, Client]:
+        """Dict[:class:`str`, :class:`rpc.Client`]: The client of every endpoint,
+        keyed by ``'host:port'``.
+        """
+        return self._clients.copy()
+
+    def set(self, **kwargs: Any) -> Self:
+        """Update custom options for the next command invocation,
+        as with :meth:`rpc.Client.set`. This includes the ``key`` option.
+        """
+        self.next_options.update(**kwargs)
+
+        return self
+
+    def get_option(self, key: str, default: Any = None) -> Any:
+        """Get an option by ``key``, as with :meth:`rpc.Client.get_option`."""
+        try:
+            return self.next_options[key]
+        except KeyError:
+            return self.options.get(key, default)
+
+    async def invoke(self, command: str, *args: Any) -> Any:
+        """Invoke a command on the endpoint it is routed to.
+
+        Parameters
+        ----------
+        command: :class:`str`
+            The name of the command you are attempting to invoke.
+        *args: Any
+            The arguments to pass to the command.
+        """
+        options = self.next_options
+        self.next_options = {}
+
+        key = options.pop('key', None)
+
+        if key is None:
+            key = args[0] if args else command
+
+        idempotent = command in options.pop(
+            'idempotent', self.options.get('idempotent', ())
+        )
+        hedge = idempotent and options.pop('hedge', self.options.get('hedge', False))
+        names = self._route(key)
+        error: Optional[BaseException] = None
+
+        while names:
+            name = names.pop(0)
+
+            if not self._clients[name].connected:
+                continue
+
+            try:
+                if hedge:
+                    return await self._invoke_hedged(name, names, command, args, options)
+
+                return await self._invoke_on(name, command, args, options)
+            except NotConnected as exc:
+                # The command may have run already, unless it is safe to run again
+                if not idempotent:
+                    raise
+
+                error = exc
+
+        raise error or NotConnected('No endpoint is connected.')
+
+    # Internals
+
+    def _route(self, key: Any) -> List[str]:
+        """Return the endpoints to try, in order."""
+        routing = self.routing
+
+        if routing == 'hash':
+            return list(self._ring.iter_nodes(key))
+
+        names = list(self._clients)
+
+        if routing == 'round_robin':
+            turn = self._turn % len(names)
+            self._turn = turn + 1
+
+            return names[turn:] + names[:turn]
+
+        latencies = self._latencies
+
+        return sorted(names, key=latencies.__getitem__)
+
+    async def _invoke_on(
+        self, name: str, command: str, args: Tuple[Any, ...], options: Dict[str, Any]
+    ) -> Any:
+        client = self._clients[name]
+
+        if options:
+            client.set(**options)
+
+        started = monotonic()
+        value = await client.invoke(command, *args)
+
+        self._record_latency(name, monotonic() - started)
+
+        return value
+
+    async def _invoke_hedged(
+        self,
+        name: str,
+        fallbacks: List[str],
+        command: str,
+        args: Tuple[Any, ...],
+        options: Dict[str, Any],
+    ) -> Any:
+        """Invoke on ``name``, and on the next connected endpoint of ``fallbacks``
+        too if there's no response within the hedging delay.
+        """
+        tasks: List[Task[Any]] = [
+            task(self._invoke_on(name, command, args, options), name='py-ipc rpc hedge')
+        ]
+
+        try:
+            delay = self._hedge_delay()
+
+            if delay is not None:
+                done, _ = await wait(tasks, timeout=delay)
+
+                while not done and fallbacks:
+                    fallback = fallbacks.pop(0)
+
+                    if self._clients[fallback].connected:
+                        tasks.append(
+                            task(
+                                self._invoke_on(fallback, command, args, options),
+                                name='py-ipc rpc hedge',
+                            )
+                        )
+                        break
+
+            while True:
+                done, _ = await wait(tasks, return_when=FIRST_COMPLETED)
+
+                for done_task in done:
+                    tasks.remove(done_task)
+
+                    # Wait for the other invocation, if the connection of this one was lost
+                    if isinstance(done_task.exception(), NotConnected) and tasks:
+                        continue
+
+                    return done_task.result()
+        finally:
+            # Cancelling the slower invocation cancels it on its server too
+            for pending in tasks:
+                pending.cancel()
+
+    def _hedge_delay(self) -> Optional[float]:
+        """Return the 95th percentile of recent response times,
+        or ``None`` if too few are known.
+
+        It is only recomputed every ``_HEDGE_DELAY_REFRESH`` response times,
+        rather than sorting the samples on every hedged invocation.
+        """
+        samples = self._samples
+
+        if len(samples) < _MIN_HEDGE_SAMPLES:
+            return None
+
+        delay = self._cached_hedge_delay
+
+        if delay is None or self._new_samples >= _HEDGE_DELAY_REFRESH:
+            delay = sorted(samples)[ceil(len(samples) * 0.95) - 1]
+            self._cached_hedge_delay = delay
+            self._new_samples = 0
+
+        return delay
+
+    def _record_latency(self, name: str, latency: float) -> None:
+        self._samples.append(latency)
+        self._new_samples += 1
+
+        latencies = self._latencies
+        average = latencies[name]
+
+        latencies[name] = (
+            latency if not average else average + _LATENCY_SMOOTHING * (latency - average)
+        )
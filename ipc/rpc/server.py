@@ -1,24 +1,66 @@
 from __future__ import annotations
 
+from asyncio import (
+    gather,
+    get_running_loop,
+)
 from sys import stderr
+from time import time
 from traceback import print_exception
 from typing import (
     TYPE_CHECKING,
     overload,
 )
 
+from ipc.core.base_connection import encode_frame
 from ipc.core.connection import Connection
+from ipc.core.errors import NotConnected
 from ipc.core.server import Server as BaseServer
-from ipc.core.utils import NULL
+from ipc.core.utils import (
+    NULL,
+    future,
+    task,
+)
+from ipc.rpc.batching import _Batcher
+from ipc.rpc.cache import _CommandCache
 from ipc.rpc.context import Context
-from ipc.rpc.errors import CommandAlreadyRegistered
-from ipc.rpc.utils import is_command
+from ipc.rpc.errors import (
+    DEADLINE_EXCEEDED,
+    OVERLOADED,
+    CommandAlreadyRegistered,
+)
+from ipc.rpc.utils import (
+    COMMAND_IDS_KEY,
+    HELLO_KEY,
+    KIND_BATCH_RESULT,
+    KIND_CHUNK,
+    KIND_CREDIT,
+    KIND_INVALIDATE,
+    is_batch,
+    is_cancel,
+    is_chunk,
+    is_chunk_end,
+    is_command,
+    is_compact_command,
+    is_credit,
+    is_notification,
+    is_stream,
+)
 
 if TYPE_CHECKING:
+    from asyncio import (
+        Future,
+        TimerHandle,
+    )
     from typing import (
         Any,
         Callable,
         Dict,
+        List,
+        Optional,
+        Sequence,
+        Set,
+        Tuple,
         Union,
         TypeVar,
     )
@@ -27,16 +69,105 @@ if TYPE_CHECKING:
         Self,
     )
 
-    from ipc.rpc.types import CommandFunc
+    from ipc.rpc.batching import BatchPolicy
+    from ipc.rpc.cache import CachePolicy
+    from ipc.rpc.types import (
+        BatchData,
+        CancelData,
+        CommandFunc,
+    )
 
     CommandFuncT = TypeVar('CommandFuncT', bound=CommandFunc)
 
 __all__ = ('Server',)
 
 
+class _LagMonitor:
+    """Measures event loop lag by checking how late a periodic timer fires."""
+
+    if TYPE_CHECKING:
+        interval: float
+        lag: float
+        _expected: float
+        _handle: Optional[TimerHandle]
+
+    __slots__ = (
+        'interval',
+        'lag',
+        '_expected',
+        '_handle',
+    )
+
+    def __init__(self, interval: float) -> None:
+        self.interval = interval
+        self.lag = 0.0
+        self._expected = 0.0
+        self._handle = None
+
+    @property
+    def running(self) -> bool:
+        return self._handle is not None
+
+    def start(self) -> None:
+        loop = get_running_loop()
+
+        self._expected = loop.time() + self.interval
+        self._handle = loop.call_at(self._expected, self._check)
+
+    def stop(self) -> None:
+        if self._handle is not None:
+            self._handle.cancel()
+            self._handle = None
+
+        self.lag = 0.0
+
+    def _check(self) -> None:
+        loop = get_running_loop()
+        now = loop.time()
+
+        self.lag = max(0.0, now - self._expected)
+        self._expected = now + self.interval
+        self._handle = loop.call_at(self._expected, self._check)
+
+
 class Server(BaseServer):
+    """Subclass of :class:`ipc.Server` that invokes commands sent by a :class:`rpc.Client`.
+
+    Parameters
+    ----------
+    commands: Dict[:class:`str`, Callable[..., Any]]
+        The initial commands, keyed by name.
+    max_in_flight: Optional[:class:`int`], default: None
+        The number of commands that may be invoked concurrently.
+    max_in_flight_per_connection: Optional[:class:`int`], default: None
+        The number of commands that may be invoked concurrently for a single connection.
+    max_loop_lag: Optional[:class:`float`], default: None
+        The number of seconds the event loop may lag behind.
+
+    Commands received above any of these limits are not invoked.
+    The client is instead immediately responded to with an error,
+    which :meth:`rpc.Client.invoke` raises as :exc:`Overloaded`.
+    Commands whose ``timeout`` has elapsed by the time they would be invoked
+    are not invoked either, and :exc:`DeadlineExceeded` is raised instead.
+    See :class:`ipc.Server` for the other parameters.
+    """
+
     if TYPE_CHECKING:
         commands: Dict[str, CommandFunc]
+        max_in_flight: Optional[int]
+        max_in_flight_per_connection: Optional[int]
+        max_loop_lag: Optional[float]
+        _in_flight: Set[Context]
+        _in_flight_per_connection: Dict[int, int]
+        _idle_waiter: Optional[Future[None]]
+        _batches: int
+        _lag_monitor: Optional[_LagMonitor]
+        _command_ids: Dict[str, int]
+        _command_names: Dict[int, str]
+        _batchers: Dict[str, _Batcher]
+        _caches: Dict[str, _CommandCache]
+        _contexts: Dict[Tuple[int, int], Context]
+        _compact_connections: Set[int]
 
     def __init__(
         self,
@@ -45,10 +176,37 @@ class Server(BaseServer):
         *,
         commands: Dict[str, CommandFunc] = NULL,
         connection_factory: Callable[[Server], Connection] = Connection,
+        heartbeat_interval: Optional[float] = None,
+        idle_timeout: Optional[float] = None,
+        max_in_flight: Optional[int] = None,
+        max_in_flight_per_connection: Optional[int] = None,
+        max_loop_lag: Optional[float] = None,
     ) -> None:
-        super().__init__(host, port, connection_factory=connection_factory)  # type: ignore
+        super().__init__(
+            host,
+            port,
+            connection_factory=connection_factory,  # type: ignore
+            heartbeat_interval=heartbeat_interval,
+            idle_timeout=idle_timeout,
+        )
 
         self.commands = commands if commands is not NULL else {}
+        self.max_in_flight = max_in_flight
+        self.max_in_flight_per_connection = max_in_flight_per_connection
+        self.max_loop_lag = max_loop_lag
+        self._in_flight = set()
+        self._in_flight_per_connection = {}
+        self._idle_waiter = None
+        self._batches = 0
+        self._lag_monitor = _LagMonitor(max_loop_lag / 2) if max_loop_lag else None
+        self._command_ids = {}
+        self._command_names = {}
+        self._batchers = {}
+        self._caches = {}
+        # In flight contexts by connection ID and nonce, for frames that refer to them
+        self._contexts = {}
+        # IDs of connections that sent the handshake, which can parse protocol frames
+        self._compact_connections = set()
 
     def __call__(self, *args: Any, **kwargs: Any) -> NoReturn:
         raise RuntimeError(
@@ -69,11 +227,343 @@ class Server(BaseServer):
         factory: Callable[[Self, Connection, Any], Context] = Context,
     ) -> None:
         if not is_command(data):
+            # Sent as a regular message, which servers from before the handshake ignore
+            if data.__class__ is dict and HELLO_KEY in data:
+                self.handle_hello(connection)
+
+            return
+
+        await self._invoke(factory(self, connection, data))
+
+    async def handle_protocol_message(
+        self,
+        connection: Connection,
+        data: Any,
+        *,
+        factory: Callable[[Self, Connection, Any], Context] = Context,
+    ) -> None:
+        """Handle a protocol frame sent by :class:`rpc.Client`.
+
+        These carry compact commands, notifications, batches and streams,
+        which can never be mistaken for messages sent with :meth:`Client.send`.
+        """
+        if is_compact_command(data) or is_stream(data) or is_notification(data):
+            await self._invoke(factory(self, connection, data))
+        elif is_credit(data) or is_chunk(data) or is_chunk_end(data):
+            self.handle_stream_frame(connection, data)
+        elif is_cancel(data):
+            self.handle_cancel(connection, data)
+        elif is_batch(data):
+            await self.handle_batch(connection, data, factory=factory)
+
+    def handle_stream_frame(self, connection: Connection, data: Any) -> None:
+        """Handle a frame sent for a call opened with :meth:`rpc.Client.stream`
+        or :meth:`rpc.Client.open`, which is ignored if the command has returned.
+        """
+        ctx = self._contexts.get((connection.id, data[1]))
+
+        if ctx is None:
             return
 
-        ctx = factory(self, connection, data)
+        kind = data[0]
+
+        if kind == KIND_CREDIT:
+            # [kind, nonce, credit]
+            ctx._add_credit(data[2])
+        elif ctx.chunks is not None:
+            if kind == KIND_CHUNK:
+                # [kind, nonce, chunk]
+                ctx.chunks._feed(data[2])
+            else:
+                # [kind, nonce]
+                ctx.chunks._finish()
+
+    def handle_cancel(self, connection: Connection, data: CancelData) -> None:
+        """Cancel a command the client stopped waiting for.
+
+        The command's task is cancelled, and ``command_cancelled`` is dispatched
+        once it has stopped. Commands that have already returned are ignored.
+        """
+        # [kind, nonce]
+        ctx = self._contexts.get((connection.id, data[1]))
+
+        if ctx is not None:
+            ctx._cancel()
+
+    async def handle_batch(
+        self,
+        connection: Connection,
+        data: BatchData,
+        *,
+        factory: Callable[[Self, Connection, Any], Context] = Context,
+    ) -> None:
+        """Invoke every command of a batch sent by :meth:`rpc.Client.batch`,
+        and respond to all of them in a single frame.
+
+        Commands are invoked concurrently, unless the client asked for them
+        to be invoked in order. Failed commands are responded to with their
+        error message as soon as they fail, so ``command_error`` listeners
+        cannot respond to them.
+        """
+        # [kind, ordered, commands]
+        _, ordered, commands = data
+        responses: List[Any] = []
+        contexts: List[Context] = []
+
+        for command in commands:
+            if is_command(command) or is_compact_command(command):
+                ctx = factory(self, connection, command)
+                ctx._responses = responses
+                contexts.append(ctx)
+
+        self._batches += 1
+
+        try:
+            if ordered:
+                for ctx in contexts:
+                    await self._invoke_batched(ctx)
+            else:
+                await gather(*(self._invoke_batched(ctx) for ctx in contexts))
+
+            if connection.connected:
+                connection._send_protocol([KIND_BATCH_RESULT, responses])
+        finally:
+            self._batches -= 1
+            self._maybe_wake_idle_waiter()
+
+    async def _invoke(self, ctx: Context) -> None:
+        """Invoke ``ctx`` unless it is shed."""
+        if not self._admit(ctx):
+            return
+
+        try:
+            await ctx.invoke()
+        finally:
+            self._release(ctx)
+
+    async def _invoke_batched(self, ctx: Context) -> None:
+        await self._invoke(ctx)
+
+        if not ctx._responded:
+            ctx.respond(str(ctx.error), error=True)
+
+    def _admit(self, ctx: Context) -> bool:
+        """Start tracking ``ctx`` as in flight, or shed it if the server is overloaded
+        or the client has stopped waiting for it.
+
+        Returns whether ``ctx`` should be invoked.
+        """
+        connection = ctx.connection
+        deadline = ctx.deadline
+
+        if deadline is not None and deadline <= time():
+            ctx.respond('Command deadline exceeded.', error=True, code=DEADLINE_EXCEEDED)
+            self.dispatch('command_expired', ctx)
+            return False
+
+        if self.is_overloaded(connection):
+            ctx.respond('Server is overloaded.', error=True, code=OVERLOADED)
+            self.dispatch('command_shed', ctx)
+            return False
+
+        per_connection = self._in_flight_per_connection
+        connection_id = connection.id
+
+        self._in_flight.add(ctx)
+
+        # Notifications have no nonce, so they can't be cancelled or streamed to
+        if not ctx.notification:
+            self._contexts[connection_id, ctx._nonce] = ctx
+
+        per_connection[connection_id] = per_connection.get(connection_id, 0) + 1
+
+        return True
+
+    def _release(self, ctx: Context) -> None:
+        """Stop tracking ``ctx`` as in flight."""
+        per_connection = self._in_flight_per_connection
+        connection_id = ctx.connection.id
+
+        self._in_flight.discard(ctx)
+
+        if self._contexts.get((connection_id, ctx._nonce)) is ctx:
+            del self._contexts[connection_id, ctx._nonce]
+
+        count = per_connection[connection_id] - 1
 
-        await ctx.invoke()
+        if count:
+            per_connection[connection_id] = count
+        else:
+            del per_connection[connection_id]
+
+        self._maybe_wake_idle_waiter()
+
+    def _maybe_wake_idle_waiter(self) -> None:
+        waiter = self._idle_waiter
+
+        if waiter is not None and not self._in_flight and not self._batches:
+            self._idle_waiter = None
+
+            if not waiter.done():
+                waiter.set_result(None)
+
+    def handle_hello(self, connection: Connection) -> None:
+        """Reply to the handshake :class:`rpc.Client` sends when it connects.
+
+        The reply maps command names to the IDs the client will use in
+        compact commands. IDs are assigned once per name and never reused,
+        so a stale ID can only refer to an unregistered command.
+        """
+        self._compact_connections.add(connection.id)
+
+        ids = self._command_ids
+
+        for name in self.commands:
+            if name not in ids:
+                self._assign_command_id(name)
+
+        connection._send_protocol({COMMAND_IDS_KEY: ids})
+
+    def _assign_command_id(self, name: str) -> None:
+        command_id = len(self._command_ids)
+
+        self._command_ids[name] = command_id
+        self._command_names[command_id] = name
+
+    def invalidate(self, command: str, args: Optional[Sequence[Any]] = None) -> Self:
+        """Drop the cached results of ``command``, if it was registered with ``cache``,
+        and tell every connected :class:`rpc.Client` to drop the results it cached
+        if it marks ``command`` as ``cacheable``.
+
+        Parameters
+        ----------
+        command: :class:`str`
+            The command name.
+        args: Optional[Sequence[Any]], default: None
+            The arguments of the result to drop. If ``None``,
+            every result of the command is dropped.
+
+        Examples
+        --------
+        Usage ::
+
+            @server.register()
+            async def set_config(ctx, key, value):
+                await db.set(key, value)
+                ctx.server.invalidate('get_config', [key])
+        """
+        cache = self._caches.get(command)
+
+        if cache is not None:
+            cache.results.invalidate(command, args)
+
+        data = (
+            [KIND_INVALIDATE, command]
+            if args is None
+            else [KIND_INVALIDATE, command, list(args)]
+        )
+
+        # Serialized once, and never skipped, as a missed invalidation leaves stale results
+        frame = encode_frame(data, protocol=True)
+
+        compact_connections = self._compact_connections
+
+        # Clients that didn't send the handshake can't parse protocol frames
+        for connection in self._connections.values():
+            if connection.connected and connection.id in compact_connections:
+                connection._write(frame)
+
+        return self
+
+    @property
+    def in_flight(self) -> int:
+        """:class:`int`: The number of commands currently being invoked."""
+        return len(self._in_flight)
+
+    @property
+    def loop_lag(self) -> float:
+        """:class:`float`: The last measured event loop lag in seconds.
+
+        This is only measured while the server is online if ``max_loop_lag``
+        was passed, and is ``0.0`` otherwise.
+        """
+        monitor = self._lag_monitor
+
+        return monitor.lag if monitor is not None else 0.0
+
+    def is_overloaded(self, connection: Optional[Connection] = None) -> bool:
+        """Whether a command received now would be shed.
+
+        Parameters
+        ----------
+        connection: Optional[:class:`Connection`], default: None
+            If passed, the per-connection limit is also checked for this connection.
+        """
+        max_in_flight = self.max_in_flight
+
+        if max_in_flight is not None and len(self._in_flight) >= max_in_flight:
+            return True
+
+        max_per_connection = self.max_in_flight_per_connection
+
+        if (
+            connection is not None
+            and max_per_connection is not None
+            and self._in_flight_per_connection.get(connection.id, 0) >= max_per_connection
+        ):
+            return True
+
+        monitor = self._lag_monitor
+        max_loop_lag = self.max_loop_lag
+
+        if (
+            monitor is not None
+            and max_loop_lag is not None
+            and monitor.lag > max_loop_lag
+        ):
+            return True
+
+        return False
+
+    def _handle_protocol_message(self, connection: Connection, message: Any) -> None:
+        task(
+            self.handle_protocol_message(connection, message),
+            name='py-ipc rpc protocol message',
+        )
+
+    def _connection_lost(self, connection: Connection) -> None:
+        super()._connection_lost(connection)
+
+        self._compact_connections.discard(connection.id)
+
+        # Stop streams waiting for credit or chunks that will never come
+        for ctx in self._in_flight:
+            if ctx.connection is connection:
+                ctx._wake_credit_waiter()
+
+                if ctx.chunks is not None and not ctx.chunks.done:
+                    ctx.chunks._finish(NotConnected('Connection is closed.'))
+
+    def _started(self) -> None:
+        super()._started()
+
+        if self._lag_monitor is not None:
+            self._lag_monitor.start()
+
+    async def disconnect(self) -> Self:
+        if self._lag_monitor is not None:
+            self._lag_monitor.stop()
+
+        return await super().disconnect()
+
+    async def _wait_in_flight(self) -> None:
+        while self._in_flight or self._batches:
+            waiter = self._idle_waiter
+
+            if waiter is None or waiter.done():
+                waiter = self._idle_waiter = future()
+
+            await waiter
 
     def on_command_error(self, ctx: Context) -> None:
         """The default ``command_error`` event listener.
@@ -90,37 +580,76 @@ class Server(BaseServer):
 
         assert exc is not None
 
-        ctx.respond(str(exc), error=True)
+        # Batched commands are responded to as soon as they fail
+        if not ctx._responded:
+            ctx.respond(str(exc), error=True)
 
         print(f'IPC command {ctx.command_name} raised an exception:', file=stderr)
         print_exception(type(exc), exc, exc.__traceback__, file=stderr)
 
     if TYPE_CHECKING:
 
+        def on_command_shed(self, ctx: Context) -> ...:
+            ...
+
+        def on_command_cancelled(self, ctx: Context) -> ...:
+            ...
+
+        def on_command_expired(self, ctx: Context) -> ...:
+            ...
+
         @overload
-        def register(self, command: str, func: CommandFunc) -> Self:
+        def register(
+            self,
+            command: str,
+            func: CommandFunc,
+            *,
+            batch: Optional[BatchPolicy] = ...,
+            cache: Optional[CachePolicy] = ...,
+        ) -> Self:
             ...
 
         @overload
-        def register(self, command: str = ...) -> Callable[[CommandFunc], CommandFunc]:
+        def register(
+            self,
+            command: str = ...,
+            *,
+            batch: Optional[BatchPolicy] = ...,
+            cache: Optional[CachePolicy] = ...,
+        ) -> Callable[[CommandFunc], CommandFunc]:
             ...
 
         @overload
-        def register(self, command: CommandFunc) -> Self:
+        def register(
+            self,
+            command: CommandFunc,
+            *,
+            batch: Optional[BatchPolicy] = ...,
+            cache: Optional[CachePolicy] = ...,
+        ) -> Self:
             ...
 
     def register(
         self,
         command: Union[str, CommandFunc] = NULL,
         func: CommandFunc = NULL,
+        *,
+        batch: Optional[BatchPolicy] = None,
+        cache: Optional[CachePolicy] = None,
     ) -> Any:
-        """Register a command."""
+        """Register a command.
+
+        If ``batch`` is passed, concurrent invocations of the command are
+        collected and it is called once per batch instead. See :class:`rpc.BatchPolicy`.
+        If ``cache`` is passed, its results are cached, and concurrent identical
+        invocations share a single call. See :class:`rpc.CachePolicy`.
+        """
         if command is NULL:  # @register()
-            return lambda f: self.register(f)
+            return lambda f: self.register(f, batch=batch, cache=cache)
         if isinstance(command, str):
             name = command
             if func is NULL:  # @register('name')
-                return lambda f: self.register(name, f)
+                return lambda f: self.register(name, f, batch=batch, cache=cache)
             # else, @register('name', func)
 
         elif callable(command):  # register(func)
@@ -134,6 +663,15 @@ class Server(BaseServer):
 
         commands[name] = func
 
+        if batch is not None:
+            self._batchers[name] = _Batcher(func, batch)
+
+        if cache is not None:
+            self._caches[name] = _CommandCache(cache)
+
+        if name not in self._command_ids:
+            self._assign_command_id(name)
+
         return self
 
     def unregister(self, command_name: str) -> Self:
@@ -149,4 +687,11 @@ class Server(BaseServer):
         except KeyError:
             pass
 
+        batcher = self._batchers.pop(command_name, None)
+
+        if batcher is not None:
+            batcher.flush()
+
+        self._caches.pop(command_name, None)
+
         return self
@@ -0,0 +1,283 @@
+from __future__ import annotations
+
+from collections import deque
+from typing import TYPE_CHECKING
+
+from ipc.core.utils import future
+from ipc.rpc.errors import RpcError
+from ipc.rpc.utils import (
+    KIND_CANCEL,
+    KIND_CHUNK,
+    KIND_CHUNK_END,
+    KIND_CREDIT,
+)
+
+if TYPE_CHECKING:
+    from asyncio import Future
+    from types import TracebackType
+    from typing import (
+        Any,
+        Deque,
+        Optional,
+        Type,
+    )
+    from typing_extensions import Self
+
+    from ipc.core.base_connection import BaseConnection
+    from ipc.rpc.client import Client
+
+
+class Stream:
+    """Asynchronous iterator over the items sent under a single nonce.
+
+    This is returned by :meth:`rpc.Client.stream` to iterate over the items
+    yielded by a command, and is :attr:`rpc.Context.chunks` to iterate over
+    the chunks sent with :meth:`Call.send`.
+
+    The command is paused while the items it sent are not iterated over, so
+    a stream that is left before its end must be closed with :meth:`.aclose`,
+    which cancels the command. Used as an asynchronous context manager,
+    the stream is closed when it exits. ::
+
+        async with client.stream('tail_logs', path) as lines:
+            async for line in lines:
+                if 'ERROR' in line:
+                    break
+    """
+
+    if TYPE_CHECKING:
+        _connection: BaseConnection
+        _nonce: int
+        _window: int
+        _items: Deque[Any]
+        _waiter: Optional[Future[None]]
+        _done: bool
+        _error: Optional[BaseException]
+        _result: Any
+        _consumed: int
+
+    __slots__ = (
+        '_connection',
+        '_nonce',
+        '_window',
+        '_items',
+        '_waiter',
+        '_done',
+        '_error',
+        '_result',
+        '_consumed',
+    )
+
+    def __init__(self, connection: BaseConnection, nonce: int, window: int) -> None:
+        self._connection = connection
+        self._nonce = nonce
+        self._window = window
+        self._items = deque()
+        self._waiter = None
+        self._done = False
+        self._error = None
+        self._result = None
+        self._consumed = 0
+
+    def __aiter__(self) -> Self:
+        return self
+
+    async def __aenter__(self) -> Self:
+        return self
+
+    async def __aexit__(
+        self,
+        exc_tp: Optional[Type[BaseException]],
+        exc: Optional[BaseException],
+        tb: Optional[TracebackType],
+    ) -> None:
+        await self.aclose()
+
+    async def __anext__(self) -> Any:
+        items = self._items
+
+        while not items:
+            if self._done:
+                if self._error is not None:
+                    raise self._error
+
+                raise StopAsyncIteration
+
+            waiter = self._waiter = future()
+
+            try:
+                await waiter
+            finally:
+                self._waiter = None
+
+        item = items.popleft()
+
+        self._consumed += 1
+
+        # Credit is granted back in chunks of half the window, rather than per item
+        if not self._done and self._consumed * 2 >= self._window:
+            connection = self._connection
+
+            if connection.connected:
+                connection._send_protocol([KIND_CREDIT, self._nonce, self._consumed])
+
+            self._consumed = 0
+
+        return item
+
+    async def aclose(self) -> None:
+        """Stop iterating, cancelling the command if it is still running.
+
+        Items that were received but not iterated over are discarded.
+        """
+        if self._done:
+            return
+
+        self._items.clear()
+        self._finish()
+
+        connection = self._connection
+
+        if connection.connected:
+            connection._send_protocol([KIND_CANCEL, self._nonce])
+
+    @property
+    def done(self) -> bool:
+        """:class:`bool`: Whether every item has been received."""
+        return self._done
+
+    def _feed(self, item: Any) -> None:
+        self._items.append(item)
+        self._wake_waiter()
+
+    def _finish(self, error: Optional[BaseException] = None, result: Any = None) -> None:
+        self._done = True
+        self._error = error
+        self._result = result
+        self._wake_waiter()
+
+    def _wake_waiter(self) -> None:
+        waiter = self._waiter
+
+        if waiter is not None and not waiter.done():
+            waiter.set_result(None)
+
+
+class Call(Stream):
+    """A command invocation that chunks are sent to, opened with :meth:`rpc.Client.open`.
+
+    Iterating over a call yields the items the command streams back, if any.
+    Used as an asynchronous context manager, the call is ended when it exits,
+    or cancelled if it exits with an exception, rather than closed.
+    """
+
+    if TYPE_CHECKING:
+        _credit: int
+        _credit_waiter: Optional[Future[None]]
+        _done_waiter: Optional[Future[None]]
+        _ended: bool
+
+    __slots__ = (
+        '_credit',
+        '_credit_waiter',
+        '_done_waiter',
+        '_ended',
+    )
+
+    def __init__(self, client: Client, nonce: int, window: int, credit: int) -> None:
+        super().__init__(client, nonce, window)
+
+        self._credit = credit
+        self._credit_waiter = None
+        self._done_waiter = None
+        self._ended = False
+
+    async def __aenter__(self) -> Self:
+        return self
+
+    async def __aexit__(
+        self,
+        exc_tp: Optional[Type[BaseException]],
+        exc: Optional[BaseException],
+        tb: Optional[TracebackType],
+    ) -> None:
+        if exc_tp is None:
+            self.end()
+        else:
+            await self.aclose()
+
+    async def send(self, chunk: Any) -> None:
+        """Send a chunk to the command.
+
+        This waits while the command has as many chunks buffered
+        as it accepts, so a slow command throttles the sender.
+
+        Parameters
+        ----------
+        chunk: Any
+            The chunk, which must be JSON serializable.
+        """
+        if self._ended:
+            raise RpcError('Call has already been ended.')
+
+        while not self._credit and not self._done:
+            waiter = self._credit_waiter = future()
+
+            try:
+                await waiter
+            finally:
+                self._credit_waiter = None
+
+        if self._done:
+            if self._error is not None:
+                raise self._error
+
+            raise RpcError('Command returned before every chunk was sent.')
+
+        self._credit -= 1
+        self._connection._send_protocol([KIND_CHUNK, self._nonce, chunk])
+
+    def end(self) -> None:
+        """Let the command know that no more chunks will be sent."""
+        if self._ended:
+            return
+
+        self._ended = True
+
+        client = self._connection
+
+        if not self._done and client.connected:
+            client._send_protocol([KIND_CHUNK_END, self._nonce])
+
+    async def result(self) -> Any:
+        """Wait for the command to return, and return its return value.
+
+        Raises the error the command responded with, if any.
+        """
+        if not self._done:
+            waiter = self._done_waiter = future()
+
+            try:
+                await waiter
+            finally:
+                self._done_waiter = None
+
+        if self._error is not None:
+            raise self._error
+
+        return self._result
+
+    def _add_credit(self, credit: int) -> None:
+        self._credit += credit
+
+        waiter = self._credit_waiter
+
+        if waiter is not None and not waiter.done():
+            waiter.set_result(None)
+
+    def _finish(self, error: Optional[BaseException] = None, result: Any = None) -> None:
+        super()._finish(error, result)
+
+        for waiter in (self._credit_waiter, self._done_waiter):
+            if waiter is not None and not waiter.done():
+                waiter.set_result(None)
@@ -15,6 +15,7 @@ if TYPE_CHECKING:
         command: str
         nonce: int
         args: NotRequired[List[Any]]
+        deadline: NotRequired[float]
 
     ResponseData = TypedDict(
         'ResponseData',
@@ -23,9 +24,35 @@ if TYPE_CHECKING:
             'nonce': int,
             'return': NotRequired[Any],
             'error': NotRequired[str],
+            'code': NotRequired[str],
         },
     )
 
+    # [kind, nonce, command id, args, deadline?]
+    CompactCommandData = List[Any]
+    # [kind, nonce, return value or error message, error code?]
+    CompactResponseData = List[Any]
+    # [kind, ordered, commands]
+    BatchData = List[Any]
+    # [kind, responses]
+    BatchResultData = List[Any]
+    # [kind, nonce, command id or name, args, credit, chunk credit?]
+    StreamData = List[Any]
+    # [kind, nonce, item]
+    StreamItemData = List[Any]
+    # [kind, nonce, credit]
+    CreditData = List[Any]
+    # [kind, nonce, chunk]
+    ChunkData = List[Any]
+    # [kind, nonce]
+    ChunkEndData = List[Any]
+    # [kind, nonce]
+    CancelData = List[Any]
+    # [kind, command, args?]
+    InvalidateData = List[Any]
+    # [kind, command id or name, args]
+    NotificationData = List[Any]
+
     class CommandFunc(Protocol):
         __name__: str
 
@@ -4,13 +4,59 @@ from typing import TYPE_CHECKING, Any
 from typing_extensions import TypeGuard
 
 if TYPE_CHECKING:
-    from ipc.rpc.types import CommandData, ResponseData
+    from ipc.rpc.types import (
+        CommandData,
+        CompactCommandData,
+        CompactResponseData,
+        ChunkData,
+        CancelData,
+        ChunkEndData,
+        CreditData,
+        InvalidateData,
+        NotificationData,
+        BatchData,
+        BatchResultData,
+        ResponseData,
+        StreamData,
+        StreamItemData,
+    )
 
 __all__ = (
     'is_command',
     'is_response',
+    'is_compact_command',
+    'is_compact_response',
+    'is_batch',
+    'is_batch_result',
+    'is_stream',
+    'is_stream_item',
+    'is_credit',
+    'is_chunk',
+    'is_chunk_end',
+    'is_cancel',
+    'is_invalidate',
+    'is_notification',
 )
 
+# Keys of the messages used to negotiate the compact format
+HELLO_KEY = '__rpc_hello__'
+COMMAND_IDS_KEY = '__rpc_command_ids__'
+
+# The first element of compact messages
+KIND_COMMAND = 0
+KIND_RETURN = 1
+KIND_ERROR = 2
+KIND_BATCH = 3
+KIND_BATCH_RESULT = 4
+KIND_STREAM = 5
+KIND_STREAM_ITEM = 6
+KIND_CREDIT = 7
+KIND_CHUNK = 8
+KIND_CHUNK_END = 9
+KIND_CANCEL = 10
+KIND_INVALIDATE = 11
+KIND_NOTIFY = 12
+
 
 def is_command(data: Any) -> TypeGuard[CommandData]:
     return isinstance(data, dict) and '__rpc_command__' in data
@@ -18,3 +64,53 @@ def is_command(data: Any) -> TypeGuard[CommandData]:
 
 def is_response(data: Any) -> TypeGuard[ResponseData]:
     return isinstance(data, dict) and '__rpc_response__' in data
+
+
+def is_compact_command(data: Any) -> TypeGuard[CompactCommandData]:
+    return data.__class__ is list and len(data) >= 4 and data[0] == KIND_COMMAND
+
+
+def is_compact_response(data: Any) -> TypeGuard[CompactResponseData]:
+    return (
+        data.__class__ is list and len(data) >= 3 and data[0] in (KIND_RETURN, KIND_ERROR)
+    )
+
+
+def is_batch(data: Any) -> TypeGuard[BatchData]:
+    return data.__class__ is list and len(data) == 3 and data[0] == KIND_BATCH
+
+
+def is_batch_result(data: Any) -> TypeGuard[BatchResultData]:
+    return data.__class__ is list and len(data) == 2 and data[0] == KIND_BATCH_RESULT
+
+
+def is_stream(data: Any) -> TypeGuard[StreamData]:
+    return data.__class__ is list and len(data) >= 5 and data[0] == KIND_STREAM
+
+
+def is_stream_item(data: Any) -> TypeGuard[StreamItemData]:
+    return data.__class__ is list and len(data) == 3 and data[0] == KIND_STREAM_ITEM
+
+
+def is_credit(data: Any) -> TypeGuard[CreditData]:
+    return data.__class__ is list and len(data) == 3 and data[0] == KIND_CREDIT
+
+
+def is_chunk(data: Any) -> TypeGuard[ChunkData]:
+    return data.__class__ is list and len(data) == 3 and data[0] == KIND_CHUNK
+
+
+def is_chunk_end(data: Any) -> TypeGuard[ChunkEndData]:
+    return data.__class__ is list and len(data) == 2 and data[0] == KIND_CHUNK_END
+
+
+def is_cancel(data: Any) -> TypeGuard[CancelData]:
+    return data.__class__ is list and len(data) == 2 and data[0] == KIND_CANCEL
+
+
+def is_invalidate(data: Any) -> TypeGuard[InvalidateData]:
+    return data.__class__ is list and len(data) in (2, 3) and data[0] == KIND_INVALIDATE
+
+
+def is_notification(data: Any) -> TypeGuard[NotificationData]:
+    return data.__class__ is list and len(data) == 3 and data[0] == KIND_NOTIFY
@@ -1,9 +1,95 @@
 import asyncio
+import json
+import re
 import types
 
+import pytest
+import pytest_asyncio
+
 
 def fake_run(coro: types.CoroutineType):
     coro.close()
 
 
 asyncio.run = fake_run
+
+# Imported once asyncio.run is patched, as the library imports it by name
+from ipc import rpc  # noqa: E402
+
+
+class FakeTransport:
+    """Stands in for an :class:`asyncio.Transport`, recording what is written to it."""
+
+    def __init__(self) -> None:
+        self.written = []
+        self.reading = True
+        self.aborted = False
+
+    def is_closing(self) -> bool:
+        return self.aborted
+
+    def write(self, data: bytes) -> None:
+        self.written.append(data)
+
+    def pause_reading(self) -> None:
+        self.reading = False
+
+    def resume_reading(self) -> None:
+        self.reading = True
+
+    def abort(self) -> None:
+        self.aborted = True
+
+    @property
+    def messages(self) -> list:
+        """The decoded payloads of the frames written so far, including protocol frames."""
+        return [json.loads(re.split(rb'[ :]', frame, 1)[1]) for frame in self.written]
+
+
+@pytest.fixture
+def make_transport():
+    return FakeTransport
+
+
+@pytest.fixture
+def transport() -> FakeTransport:
+    return FakeTransport()
+
+
+def get_port(server: rpc.Server) -> int:
+    """Return the port a server started on port ``0`` is listening on."""
+    return server._server.sockets[0].getsockname()[1]
+
+
+@pytest_asyncio.fixture
+async def start_server():
+    """Starts :class:`rpc.Server` instances on free ports, returning each with its port,
+    and closes them once the test is done.
+    """
+    servers = []
+
+    async def start(**options) -> tuple:
+        server = rpc.Server('127.0.0.1', 0, **options)
+        servers.append(server)
+        await server.connect()
+
+        return server, get_port(server)
+
+    yield start
+
+    for server in servers:
+        await server.close()
+
+
+@pytest.fixture
+def wait_until():
+    """Polls a condition until it is true, rather than sleeping for a fixed time."""
+
+    async def wait_until(predicate, timeout: float = 1.0) -> None:
+        async def poll() -> None:
+            while not predicate():
+                await asyncio.sleep(0.001)
+
+        await asyncio.wait_for(poll(), timeout)
+
+    return wait_until
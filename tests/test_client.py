@@ -1,3 +1,5 @@
+import asyncio
+import re
 import types
 
 import pytest
@@ -37,3 +39,114 @@ async def test_client_connect(client: ipc.Client) -> None:
         assert client.connect(run_sync=True) is client
     finally:
         coro.close()
+
+
+@pytest.mark.asyncio
+async def test_client_messages(client: ipc.Client, transport) -> None:
+    client._transport = transport
+
+    messages = client.messages(maxsize=2)
+    first = asyncio.ensure_future(messages.__anext__())
+    await asyncio.sleep(0)
+
+    assert len(client._message_queues) == 1
+
+    client._protocol_cb_data_received(b'1 13 "a"3 [1]')
+
+    assert not transport.reading
+    assert await first == 1
+    assert not transport.reading
+    assert await messages.__anext__() == 'a'
+    assert transport.reading
+
+    client._protocol_cb_data_received(b'4 true')
+
+    assert not transport.reading
+    assert await messages.__anext__() == [1]
+    assert transport.reading
+
+    client._protocol_cb_connection_lost(None)
+
+    assert await messages.__anext__() is True
+
+    with pytest.raises(StopAsyncIteration):
+        await messages.__anext__()
+
+    assert not client._message_queues
+
+
+@pytest.mark.asyncio
+async def test_client_messages_raise_not_connected(client: ipc.Client) -> None:
+    with pytest.raises(ipc.NotConnected):
+        await client.messages().__anext__()
+
+
+@pytest.mark.asyncio
+async def test_client_subscribe(client: ipc.Client, transport) -> None:
+    assert client.subscribe('a', 'b.*') is client
+
+    with pytest.raises(ValueError):
+        client.subscribe('#.a')
+
+    client._protocol_cb_connection_made(transport)
+
+    assert len(transport.written) == 1
+    assert client.subscriptions == {'a', 'b.*'}
+
+    client.subscribe('a', 'c')
+    client.unsubscribe('a', 'd')
+
+    assert transport.messages[1:] == [
+        {'__ipc_subscribe__': ['c']},
+        {'__ipc_unsubscribe__': ['a']},
+    ]
+    # Sent as protocol frames, so they can't be mistaken for user data
+    assert all(re.match(rb'\d+:', frame) for frame in transport.written)
+    assert client.subscriptions == {'b.*', 'c'}
+
+    published = []
+    messages = []
+    client.add_listener('publish', lambda *args: published.append(args))
+    client.add_listener('message', messages.append)
+    client._handle_protocol_message({'__ipc_publish__': 'c', 'data': [1]})
+    client._handle_message({'__ipc_publish__': 'c', 'data': [2]})
+    await asyncio.sleep(0)
+
+    assert published == [('c', [1])]
+    assert messages == [{'__ipc_publish__': 'c', 'data': [2]}]
+
+
+def test_client_ping(client: ipc.Client, transport) -> None:
+    client._transport = transport
+
+    assert client.ping() is client
+
+    ping = transport.messages[0]
+    client._protocol_cb_data_received(transport.written[0])
+    pong = transport.messages[1]
+
+    assert pong == {'__ipc_pong__': ping['__ipc_ping__']}
+    # Heartbeats are protocol frames, so they can't be mistaken for user data
+    assert all(re.match(rb'\d+:', frame) for frame in transport.written)
+
+    client._protocol_cb_data_received(transport.written[1])
+
+    assert client.rtt is not None and client.rtt >= 0
+
+
+@pytest.mark.asyncio
+async def test_client_protocol_frames(client: ipc.Client) -> None:
+    messages = []
+    protocol_messages = []
+    client.add_listener('message', messages.append)
+    client._handle_protocol_message = protocol_messages.append  # type: ignore
+
+    client._protocol_cb_data_received(b'3 [1]3:[2]1')
+    client._protocol_cb_data_received(b' 3')
+    await asyncio.sleep(0)
+
+    assert messages == [[1], 3]
+    assert protocol_messages == [[2]]
+
+    with pytest.raises(ValueError):
+        client._protocol_cb_data_received(b'a 1')
@@ -308,3 +308,42 @@ def test_events_remove_all_listeners(events: EventManager) -> None:
     events.remove_all_listeners()
 
     assert_listener_not_stored(events)
+
+
+def test_events_stats_disabled(events: EventManager) -> None:
+    assert events._stats is None
+    assert events.stats() == {}
+    assert events.enable_stats() is events
+    assert events._stats == {}
+    assert events.disable_stats() is events
+    assert events._stats is None
+
+
+@pytest.mark.asyncio
+async def test_events_stats(events: EventManager) -> None:
+    async def listener():
+        await asyncio.sleep(0.001)
+
+    events.enable_stats()
+    events.add_listener('', listener)
+    events.on_ = listener  # type: ignore
+    events.dispatch('')
+    events.dispatch('other')
+
+    await asyncio.sleep(0.01)
+
+    stats = events.stats()
+
+    assert stats.keys() == {'', 'other'}
+    assert stats[''].dispatches == 1
+    assert stats[''].calls == 2
+    assert sum(stats[''].histogram) == 2
+    assert stats[''].exec_time >= 0.002
+    assert stats[''].max_exec_time <= stats[''].percentile(100)
+    assert stats['other'].dispatches == 1
+    assert stats['other'].calls == 0
+    assert stats['other'].percentile(50) == 0.0
+
+    stats[''].calls = 0
+
+    assert events.stats()[''].calls == 2
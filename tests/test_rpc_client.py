@@ -1,9 +1,15 @@
 import asyncio
+import json
+import re
+import time
 import types
+from typing import Coroutine
 
 import pytest
 
 from ipc import rpc, utils
+from ipc.core.base_connection import encode_frame
+from ipc.core.errors import NotConnected
 from ipc.rpc.client_commands import ClientCommands
 
 
@@ -59,3 +65,423 @@ def test_rpc_client_commands(client: rpc.Client) -> None:
     del client.commands
     assert not hasattr(client, '_commands')
     assert hasattr(client, 'commands')
+
+
+@pytest.mark.asyncio
+async def test_rpc_client_batch(client: rpc.Client, transport) -> None:
+    client._transport = transport
+    client._compact_negotiated = True
+
+    with pytest.raises(RuntimeError):
+        async with client.batch() as batch:
+            fut = batch.invoke('foo')
+            raise RuntimeError
+
+    assert fut.cancelled()
+    assert not client._response_waiters
+    assert not transport.written
+
+    async with client.set(timeout=10).batch() as batch:
+        fut = batch.invoke('foo', 1)
+
+    with pytest.raises(rpc.RpcError):
+        batch.invoke('foo')
+
+    assert transport.messages == [
+        [
+            3,
+            False,
+            [{'__rpc_command__': True, 'command': 'foo', 'nonce': 1, 'args': [1]}],
+        ]
+    ]
+
+    client._handle_protocol_message(
+        [4, [{'__rpc_response__': True, 'nonce': 1, 'return': 2}]]
+    )
+
+    assert await fut == 2
+
+    await asyncio.sleep(0)
+
+    # The timeout timer doesn't outlive the batch
+    assert batch._timer is None
+    assert not len(client._timers)
+
+
+@pytest.mark.asyncio
+async def test_rpc_client_auto_batch(transport) -> None:
+    client = rpc.Client('', 0, batch_window=0, max_batch_size=2)
+    client._transport = transport
+    client._compact_negotiated = True
+
+    tasks = [asyncio.ensure_future(client.commands.foo(i)) for i in range(3)]
+    await asyncio.sleep(0)
+
+    # The first two are sent as soon as max_batch_size is reached
+    assert len(transport.messages) == 1
+    assert [command['args'] for command in transport.messages[0][2]] == [[0], [1]]
+
+    await asyncio.sleep(0)
+
+    assert len(transport.messages) == 2
+    assert [command['args'] for command in transport.messages[1][2]] == [[2]]
+
+    client._handle_protocol_message(
+        [
+            4,
+            [
+                {'__rpc_response__': True, 'nonce': command['nonce'], 'return': i}
+                for i, command in enumerate(
+                    transport.messages[0][2] + transport.messages[1][2]
+                )
+            ],
+        ]
+    )
+
+    assert await asyncio.gather(*tasks) == [0, 1, 2]
+    assert not client._response_waiters
+
+
+@pytest.mark.asyncio
+async def test_rpc_client_max_in_flight(transport) -> None:
+    client = rpc.Client('', 0, max_in_flight=1, compact=False)
+    client._transport = transport
+
+    async def start(coro: Coroutine) -> asyncio.Future:
+        fut = asyncio.ensure_future(coro)
+
+        # Let the invocation be queued before the next one sets its options
+        for _ in range(3):
+            await asyncio.sleep(0)
+
+        return fut
+
+    first = await start(client.invoke('first'))
+    low = await start(client.invoke('low'))
+    high = await start(client.set(priority=-1).invoke('high'))
+    timed_out = await start(client.set(timeout=0.01).invoke('timed_out'))
+
+    assert [data['command'] for data in transport.messages] == ['first']
+    assert client.in_flight == 1
+    assert client.queue_stats().depth == 3
+
+    with pytest.raises(asyncio.TimeoutError):
+        await timed_out
+
+    for expected in ('first', 'high', 'low'):
+        assert transport.messages[-1]['command'] == expected
+
+        client.handle_response(
+            {
+                '__rpc_response__': True,
+                'nonce': transport.messages[-1]['nonce'],
+                'return': expected,
+            }
+        )
+
+        for _ in range(3):
+            await asyncio.sleep(0)
+
+    assert await asyncio.gather(first, high, low) == ['first', 'high', 'low']
+
+    stats = client.queue_stats()
+
+    assert stats.depth == 0
+    assert stats.in_flight == 0
+    assert stats.acquired == 3
+    assert stats.max_wait_time > 0
+
+
+@pytest.mark.asyncio
+async def test_rpc_client_max_in_flight_auto_batch(transport) -> None:
+    client = rpc.Client('', 0, max_in_flight=1, batch_window=0, compact=False)
+    client._transport = transport
+
+    tasks = [asyncio.ensure_future(client.invoke('foo', i)) for i in range(2)]
+
+    for i in range(2):
+        for _ in range(3):
+            await asyncio.sleep(0)
+
+        # Without the handshake, batched commands are sent one at a time
+        command = transport.messages[-1]
+
+        assert command['args'] == [i]
+
+        client.handle_response(
+            {'__rpc_response__': True, 'nonce': command['nonce'], 'return': i}
+        )
+
+    assert await asyncio.gather(*tasks) == [0, 1]
+    assert client.in_flight == 0
+    assert client.queue_stats().depth == 0
+
+
+@pytest.mark.asyncio
+async def test_rpc_client_compact_responses(client: rpc.Client, transport) -> None:
+    messages = []
+    client.add_listener('message', messages.append)
+    client._protocol_cb_connection_made(transport)
+
+    # An ordinary message, which servers from before the handshake ignore
+    assert transport.written == [encode_frame({'__rpc_hello__': 1})]
+
+    invoke = asyncio.ensure_future(client.invoke('foo'))
+    await asyncio.sleep(0)
+
+    # A user message that looks like a compact response is only a message
+    client._protocol_cb_data_received(encode_frame([1, 0, 'oops']))
+    # Compact responses are ignored until command IDs are received
+    client._handle_protocol_message([1, 0, 'early'])
+    await asyncio.sleep(0)
+
+    assert messages == [[1, 0, 'oops']]
+    assert not invoke.done()
+
+    client._protocol_cb_data_received(
+        encode_frame({'__rpc_command_ids__': {'foo': 0}}, protocol=True)
+    )
+    client._protocol_cb_data_received(encode_frame([1, 0, 'ok'], protocol=True))
+
+    assert await invoke == 'ok'
+    assert client._build_command('foo', 1, ()) == [0, 1, 0, []]
+
+
+def test_rpc_client_build_command_deadline(client: rpc.Client) -> None:
+    assert client._build_command('foo', 0, (1,), 10.0) == {
+        '__rpc_command__': True,
+        'command': 'foo',
+        'nonce': 0,
+        'args': [1],
+        'deadline': 10.0,
+    }
+
+    client._command_ids = {'foo': 3}
+
+    assert client._build_command('foo', 0, (), 10.0) == [0, 0, 3, [], 10.0]
+    assert client._build_command('foo', 0, ()) == [0, 0, 3, []]
+
+
+@pytest.mark.asyncio
+async def test_rpc_client_cache(transport) -> None:
+    client = rpc.Client('', 0, cacheable={'get': 10.0}, cache_size=2)
+    client._protocol_cb_connection_made(transport)
+    client._handle_protocol_message({'__rpc_command_ids__': {'get': 0, 'other': 1}})
+
+    async def respond(command: str, *args, value=None):
+        invoke = asyncio.ensure_future(client.invoke(command, *args))
+        await asyncio.sleep(0)
+
+        if not invoke.done():
+            client._handle_protocol_message([1, transport.messages[-1][1], value])
+
+        return await invoke
+
+    assert await respond('get', 1, value='a') == 'a'
+    sent = len(transport.written)
+
+    # Cached results are returned without a round trip
+    assert await respond('get', 1) == 'a'
+    assert len(transport.written) == sent
+
+    assert await respond('other', 1, value='b') == 'b'
+    assert await respond('other', 1, value='c') == 'c'
+
+    assert await respond('get', [2], value='d') == 'd'
+    assert await respond('get', 3, value='e') == 'e'
+    # The least recently used result was evicted
+    assert await respond('get', 1, value='f') == 'f'
+    assert await respond('get', [2], value='g') == 'g'
+
+    client._handle_protocol_message([11, 'get', [[2]]])
+
+    assert await respond('get', [2], value='h') == 'h'
+    assert await respond('get', 1) == 'f'
+
+    client._handle_protocol_message([11, 'get'])
+
+    assert await respond('get', 1, value='i') == 'i'
+
+    # An invalidation while awaiting a response keeps it from being cached
+    invoke = asyncio.ensure_future(client.invoke('get', 4))
+    await asyncio.sleep(0)
+    client.invalidate('get')
+    client._handle_protocol_message([1, transport.messages[-1][1], 'j'])
+
+    assert await invoke == 'j'
+    assert await respond('get', 4, value='k') == 'k'
+
+
+@pytest.mark.asyncio
+async def test_rpc_client_connection_lost(client: rpc.Client, transport) -> None:
+    client._protocol_cb_connection_made(transport)
+
+    invoke = asyncio.ensure_future(client.invoke('foo'))
+    await asyncio.sleep(0)
+
+    client._protocol_cb_connection_lost(None)
+
+    # Pending invocations fail fast rather than wait for their timeout
+    with pytest.raises(NotConnected):
+        await invoke
+
+    assert not client._response_waiters
+
+
+async def start_legacy_server(commands: list, errors: list) -> asyncio.AbstractServer:
+    """Start a server that, like those from before the compact format,
+    only parses '<length> <json>' frames and dict commands.
+    """
+
+    async def handle(reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        buffer = b''
+
+        while True:
+            data = await reader.read(1024)
+
+            if not data:
+                break
+
+            buffer += data
+
+            while buffer:
+                header = re.match(rb'(\d+) ', buffer)
+
+                if header is None:
+                    errors.append(buffer)
+                    writer.close()
+                    return
+
+                end = header.end() + int(header.group(1))
+
+                if len(buffer) < end:
+                    break
+
+                message = json.loads(buffer[header.end() : end])
+                buffer = buffer[end:]
+
+                if isinstance(message, dict) and '__rpc_command__' in message:
+                    commands.append(message)
+
+                    if message['command'] == 'hang':
+                        continue
+
+                    writer.write(
+                        encode_frame(
+                            {
+                                '__rpc_response__': True,
+                                'nonce': message['nonce'],
+                                'return': message.get('args', []),
+                            }
+                        )
+                    )
+
+    return await asyncio.start_server(handle, '127.0.0.1', 0)
+
+
+@pytest.mark.asyncio
+async def test_rpc_client_legacy_server() -> None:
+    commands = []
+    errors = []
+    server = await start_legacy_server(commands, errors)
+    port = server.sockets[0].getsockname()[1]
+
+    try:
+        async with rpc.Client('127.0.0.1', port, handshake_timeout=0.05) as client:
+            # The handshake was ignored, so every command is a dict
+            assert not client._compact_negotiated
+            assert await client.invoke('echo', 1) == [1]
+
+            async with client.batch(ordered=True) as batch:
+                first = batch.invoke('echo', 2)
+                second = batch.invoke('echo', 3)
+
+            assert await asyncio.gather(first, second) == [[2], [3]]
+
+            # Timing out doesn't send a cancel frame the server can't parse
+            with pytest.raises(asyncio.TimeoutError):
+                await client.set(timeout=0.01).invoke('hang', 4)
+
+            client.notify('echo', 5)
+
+            with pytest.raises(rpc.RpcError):
+                client.stream('echo')
+
+            assert await client.invoke('echo', 6) == [6]
+            assert [command['args'] for command in commands] == [
+                [1],
+                [2],
+                [3],
+                [4],
+                [5],
+                [6],
+            ]
+            assert not client._response_waiters
+            assert not errors
+    finally:
+        server.close()
+        await server.wait_closed()
+
+
+@pytest.mark.asyncio
+async def test_rpc_client_timeouts(start_server) -> None:
+    server, port = await start_server()
+
+    @server.register('hang')
+    async def hang(ctx: rpc.Context) -> None:
+        await asyncio.sleep(10)
+
+    server.register('echo')(lambda ctx, value: value)
+
+    async with rpc.Client('127.0.0.1', port, max_in_flight=2, timeout=0.05) as client:
+        started = time.monotonic()
+        results = await asyncio.gather(
+            *(client.invoke('hang') for _ in range(5)), return_exceptions=True
+        )
+
+        # Both in flight and queued invocations time out
+        assert all(isinstance(result, asyncio.TimeoutError) for result in results)
+        assert time.monotonic() - started < 1
+        assert not len(client._timers)
+        assert client.queue_stats()[:2] == (0, 0)
+        assert await client.set(timeout=1).invoke('echo', 1) == 1
+
+        # Timers of invocations that were responded to are cancelled
+        assert not len(client._timers)
+
+
+@pytest.mark.asyncio
+async def test_rpc_client_reconnect(start_server, wait_until) -> None:
+    server, port = await start_server()
+    calls = []
+
+    @server.register('slow')
+    async def slow(ctx: rpc.Context) -> int:
+        calls.append(ctx.connection.id)
+        await asyncio.sleep(0.02)
+        return len(calls)
+
+    client = rpc.Client(
+        '127.0.0.1', port, reconnect=True, reconnect_delay=0.01, idempotent={'slow'}
+    )
+    await client.connect()
+
+    try:
+        other = asyncio.ensure_future(client.set(idempotent=()).invoke('slow'))
+        await asyncio.sleep(0)
+        idempotent = asyncio.ensure_future(client.invoke('slow'))
+        await wait_until(lambda: len(calls) == 2)
+
+        server.connections[0]._transport.abort()
+
+        with pytest.raises(NotConnected):
+            await other
+
+        # The idempotent invocation is sent again once reconnected
+        assert await asyncio.wait_for(idempotent, 1) == 3
+        assert client.connected
+        assert len(set(calls)) == 2
+    finally:
+        await client.close()
+
+    assert client._reconnect_task is None
@@ -0,0 +1,87 @@
+import asyncio
+
+import pytest
+
+from ipc import rpc
+from ipc.rpc import client as client_module
+
+
+def register_commands(server: rpc.Server) -> None:
+    @server.register('echo')
+    def echo(ctx: rpc.Context, value: int) -> int:
+        return value
+
+    @server.register('wait')
+    async def wait(ctx: rpc.Context) -> None:
+        await asyncio.sleep(0.01)
+
+
+@pytest.mark.asyncio
+async def test_rpc_client_pool_least_loaded(start_server) -> None:
+    server, port = await start_server()
+    register_commands(server)
+
+    async with rpc.ClientPool('127.0.0.1', port, size=3) as pool:
+        assert len(server.connections) == 3
+
+        waiting = [asyncio.ensure_future(pool.invoke('wait')) for _ in range(3)]
+        await asyncio.sleep(0)
+
+        # Each invocation went to the connection with the fewest awaiting a response
+        assert [client.pending for client in pool.clients] == [1, 1, 1]
+
+        assert await pool.set(timeout=1).invoke('echo', 1) == 1
+
+        await asyncio.gather(*waiting)
+
+
+@pytest.mark.asyncio
+async def test_rpc_client_pool_replaces_lost_connections(
+    start_server, wait_until
+) -> None:
+    server, port = await start_server()
+    register_commands(server)
+
+    async with rpc.ClientPool('127.0.0.1', port, size=2, retry_interval=0.01) as pool:
+        lost = pool.clients[0]
+
+        for connection in server.connections:
+            peer = connection._transport.get_extra_info('peername')
+
+            if peer == lost._transport.get_extra_info('sockname'):
+                connection._transport.abort()
+
+        await wait_until(lambda: not lost.connected)
+
+        # Invocations are sent over the remaining connection meanwhile
+        assert await pool.invoke('echo', 2) == 2
+
+        await wait_until(lambda: lost not in pool.clients)
+
+        assert all(client.connected for client in pool.clients)
+        assert len(server.connections) == 2
+
+    assert not any(client.connected for client in pool.clients)
+
+
+@pytest.mark.asyncio
+async def test_rpc_invoke_shared_pool(start_server) -> None:
+    server, port = await start_server()
+    register_commands(server)
+
+    results = await asyncio.gather(
+        *(rpc.invoke('127.0.0.1', port, 'echo', i) for i in range(10))
+    )
+
+    assert results == list(range(10))
+
+    pools = client_module._shared_pools[asyncio.get_running_loop()]
+    pool = pools['127.0.0.1', port].result()
+
+    # Every call shares a single connection
+    assert pool.size == 1
+    assert len(server.connections) == 1
+    assert rpc.client.invoke is rpc.invoke
+
+    await pool.close()
+    del pools['127.0.0.1', port]
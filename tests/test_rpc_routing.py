@@ -0,0 +1,143 @@
+import asyncio
+
+import pytest
+
+from ipc import rpc
+
+
+async def start_named_server(start_server, name: str, delay: float = 0) -> tuple:
+    server, port = await start_server()
+
+    @server.register('whoami')
+    async def whoami(ctx: rpc.Context, key: object = None) -> str:
+        await asyncio.sleep(delay)
+        return name
+
+    return server, ('127.0.0.1', port)
+
+
+def test_hash_ring_only_moves_keys_of_removed_node() -> None:
+    ring = rpc.HashRing(['a', 'b', 'c'])
+    before = {key: ring.get(key) for key in range(1000)}
+
+    # Every node owns part of the keys
+    assert set(before.values()) == {'a', 'b', 'c'}
+
+    ring.remove('b')
+    after = {key: ring.get(key) for key in range(1000)}
+
+    assert len(ring) == 2
+    assert all(after[key] == node for key, node in before.items() if node != 'b')
+    assert list(ring.iter_nodes(1))[0] == ring.get(1)
+    assert sorted(ring.iter_nodes(1)) == ['a', 'c']
+
+    with pytest.raises(LookupError):
+        rpc.HashRing().get(1)
+
+
+def test_rpc_multi_client_hedge_delay() -> None:
+    client = rpc.MultiClient([('127.0.0.1', 1)])
+
+    for _ in range(19):
+        client._record_latency('127.0.0.1:1', 0.01)
+
+    assert client._hedge_delay() is None
+
+    client._record_latency('127.0.0.1:1', 0.01)
+
+    assert client._hedge_delay() == 0.01
+
+    # The delay is cached until enough new response times are recorded
+    for _ in range(15):
+        client._record_latency('127.0.0.1:1', 1)
+
+    assert client._hedge_delay() == 0.01
+
+    client._record_latency('127.0.0.1:1', 1)
+
+    assert client._hedge_delay() == 1
+
+
+@pytest.mark.asyncio
+async def test_rpc_multi_client_hash_routing(start_server, wait_until) -> None:
+    servers, endpoints = zip(
+        *[await start_named_server(start_server, name) for name in 'abc']
+    )
+
+    async with rpc.MultiClient(endpoints, idempotent={'whoami'}) as client:
+        owners = {key: await client.invoke('whoami', key) for key in range(20)}
+
+        # The same key always goes to the same server
+        assert len(set(owners.values())) > 1
+        assert await client.invoke('whoami', 5) == owners[5]
+        assert await client.set(key=5).invoke('whoami') == owners[5]
+
+        # Keys of a lost server go to the next one on the ring
+        index = 'abc'.index(owners[5])
+        lost = client.clients['%s:%d' % endpoints[index]]
+        await servers[index].close()
+        await wait_until(lambda: not lost.connected)
+
+        assert await client.invoke('whoami', 5) != owners[5]
+
+        for key, owner in owners.items():
+            if owner != owners[5]:
+                assert await client.invoke('whoami', key) == owner
+
+
+@pytest.mark.asyncio
+async def test_rpc_multi_client_round_robin_and_least_latency(start_server) -> None:
+    _, fast = await start_named_server(start_server, 'fast')
+    _, slow = await start_named_server(start_server, 'slow', delay=0.05)
+    endpoints = [fast, slow]
+
+    async with rpc.MultiClient(endpoints, routing='round_robin') as client:
+        assert [await client.invoke('whoami') for _ in range(4)] == [
+            'fast',
+            'slow',
+            'fast',
+            'slow',
+        ]
+
+    async with rpc.MultiClient(endpoints, routing='least_latency') as client:
+        # Unmeasured endpoints are tried first
+        assert {await client.invoke('whoami') for _ in range(2)} == {'fast', 'slow'}
+        assert [await client.invoke('whoami') for _ in range(3)] == ['fast'] * 3
+
+    with pytest.raises(ValueError):
+        rpc.MultiClient(endpoints, routing='random')  # type: ignore
+
+
+@pytest.mark.asyncio
+async def test_rpc_multi_client_hedging(start_server, wait_until) -> None:
+    servers, endpoints = zip(
+        *[await start_named_server(start_server, name) for name in 'ab']
+    )
+    stalled = False
+
+    @servers[1].register('get')
+    async def get(ctx: rpc.Context) -> str:
+        if stalled:
+            await asyncio.sleep(1)
+
+        return 'b'
+
+    servers[0].register('get')(lambda ctx: 'a')
+
+    async with rpc.MultiClient(
+        endpoints, routing='round_robin', hedge=True, idempotent={'get'}
+    ) as client:
+        # Response times are measured before hedging
+        for _ in range(20):
+            await client.invoke('get')
+
+        stalled = True
+        started = asyncio.get_running_loop().time()
+
+        assert await client.invoke('get') == 'a'
+        # Routed to the stalled server first, then hedged to the other
+        assert await client.invoke('get') == 'a'
+        assert asyncio.get_running_loop().time() - started < 0.5
+
+        # The slower invocation was cancelled
+        await wait_until(lambda: not servers[1]._contexts)
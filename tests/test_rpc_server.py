@@ -1,8 +1,13 @@
+import asyncio
 import re
+import time
 
 import pytest
 
 from ipc import rpc
+from ipc.core.connection import Connection
+from ipc.core.errors import NotConnected
+from ipc.rpc.errors import ServerError
 
 
 @pytest.fixture
@@ -99,3 +104,583 @@ def test_rpc_server_register_decorator_no_call_raise_runtime_error(
 
     with pytest.raises(RuntimeError, match=msg):
         command()
+
+
+@pytest.mark.asyncio
+async def test_rpc_server_drain(start_server) -> None:
+    server, port = await start_server()
+    started = asyncio.Event()
+
+    @server.register('slow')
+    async def slow(ctx: rpc.Context) -> int:
+        started.set()
+        await asyncio.sleep(0.05)
+        return 1
+
+    client = rpc.Client('127.0.0.1', port)
+    await client.connect()
+
+    try:
+        invoke = asyncio.ensure_future(client.invoke('slow'))
+        await started.wait()
+
+        assert server.in_flight == 1
+
+        await server.drain(timeout=1)
+
+        assert await invoke == 1
+        assert server.in_flight == 0
+        assert not server.connected
+        assert not server.connections
+    finally:
+        await client.close()
+
+
+@pytest.mark.asyncio
+async def test_rpc_server_drain_timeout(start_server) -> None:
+    server, port = await start_server()
+    started = asyncio.Event()
+    release = asyncio.Event()
+    disconnects = []
+    server.add_listener('disconnect', lambda *args: disconnects.append(args))
+
+    @server.register('hang')
+    async def hang(ctx: rpc.Context) -> None:
+        started.set()
+        await release.wait()
+
+    client = rpc.Client('127.0.0.1', port)
+    await client.connect()
+
+    try:
+        invoke = asyncio.ensure_future(client.invoke('hang'))
+        await started.wait()
+        await server.drain(timeout=0.01)
+
+        assert not server.connections
+
+        await asyncio.sleep(0)
+
+        assert not disconnects
+    finally:
+        invoke.cancel()
+        release.set()
+        await client.close()
+        # Let the command finish before the loop closes
+        await asyncio.sleep(0)
+
+
+@pytest.mark.asyncio
+async def test_rpc_server_admission_control(start_server) -> None:
+    server, port = await start_server(max_in_flight_per_connection=1)
+    started = asyncio.Event()
+    shed = []
+    server.add_listener('command_shed', shed.append)
+
+    @server.register('slow')
+    async def slow(ctx: rpc.Context) -> int:
+        started.set()
+        await asyncio.sleep(0.02)
+        return 1
+
+    async with rpc.Client('127.0.0.1', port) as client:
+        first = asyncio.ensure_future(client.invoke('slow'))
+        await started.wait()
+
+        with pytest.raises(rpc.Overloaded):
+            await client.invoke('slow')
+
+        assert await first == 1
+        assert len(shed) == 1
+        assert await client.invoke('slow') == 1
+
+
+def test_rpc_server_is_overloaded(server: rpc.Server) -> None:
+    assert not server.is_overloaded()
+
+    server.max_in_flight = 0
+
+    assert server.is_overloaded()
+
+
+@pytest.mark.asyncio
+async def test_rpc_server_loop_lag(wait_until) -> None:
+    server = rpc.Server('127.0.0.1', 0, max_loop_lag=0.01)
+
+    assert not server.is_overloaded()
+    assert not server._lag_monitor.running
+
+    await server.connect()
+
+    assert server._lag_monitor.running
+
+    time.sleep(0.03)  # block the loop
+    await wait_until(lambda: server.loop_lag > 0.01)
+
+    assert server.is_overloaded()
+
+    await server.disconnect()
+
+    assert server.loop_lag == 0.0
+
+
+@pytest.mark.asyncio
+async def test_rpc_server_compact_commands(start_server, wait_until) -> None:
+    server, port = await start_server()
+    received = []
+    messages = []
+    server.add_listener('command', received.append)
+    server.add_listener('message', lambda connection, data: messages.append(data))
+
+    @server.register('echo')
+    def echo(ctx: rpc.Context, *args: int) -> list:
+        return list(args)
+
+    @server.register('fail')
+    def fail(ctx: rpc.Context) -> None:
+        raise RuntimeError
+
+    async with rpc.Client('127.0.0.1', port) as client:
+        # Connecting waits for the handshake
+        assert client._command_ids == {'echo': 0, 'fail': 1}
+        assert await client.invoke('echo', 1, 2) == [1, 2]
+        assert received[-1].compact
+        assert received[-1].command_name == 'echo'
+
+        with pytest.raises(ServerError):
+            await client.invoke('fail')
+
+        with pytest.raises(ServerError):
+            await client.invoke('missing')
+
+        assert not received[-1].compact
+        assert received[-1].command_name == 'missing'
+
+        # User messages are never mistaken for compact commands
+        client.send([0, 5, 0, [3]])
+        await wait_until(lambda: messages[-1] == [0, 5, 0, [3]])
+
+        assert received[-1].command_name == 'missing'
+
+    async with rpc.Client('127.0.0.1', port, compact=False) as client:
+        assert await client.invoke('echo', 1) == [1]
+        assert client._command_ids == {}
+        assert not received[-1].compact
+
+
+@pytest.mark.asyncio
+async def test_rpc_server_batch(start_server) -> None:
+    server, port = await start_server()
+    received = []
+    order = []
+    server.add_listener('message', lambda connection, data: received.append(data))
+
+    @server.register('sleep')
+    async def sleep(ctx: rpc.Context, delay: float) -> float:
+        await asyncio.sleep(delay)
+        order.append(delay)
+        return delay
+
+    @server.register('fail')
+    def fail(ctx: rpc.Context) -> None:
+        raise RuntimeError('failed')
+
+    errors = []
+    errored = asyncio.Event()
+
+    async def on_command_error(ctx: rpc.Context) -> None:
+        await asyncio.sleep(0.01)
+        errors.append(ctx._responded)
+        errored.set()
+
+    server.add_listener('command_error', on_command_error)
+
+    async with rpc.Client('127.0.0.1', port) as client:
+        async with client.batch() as batch:
+            slow = batch.invoke('sleep', 0.02)
+            fast = batch.invoke('sleep', 0.01)
+            failed = batch.invoke('fail')
+
+        assert len(batch) == 3
+        assert await slow == 0.02
+        assert await fast == 0.01
+        assert order == [0.01, 0.02]
+
+        with pytest.raises(ServerError, match='failed'):
+            await failed
+
+        await asyncio.wait_for(errored.wait(), 1)
+
+        # The failed command was responded to before command_error listeners ran
+        assert errors == [True]
+
+        order.clear()
+
+        async with client.batch(ordered=True) as batch:
+            slow = batch.invoke('sleep', 0.02)
+            fast = batch.invoke('sleep', 0.01)
+
+        assert await fast == 0.01
+        assert order == [0.02, 0.01]
+        # Batches are protocol frames, rather than messages
+        assert received == [{'__rpc_hello__': 1}]
+        assert not client._response_waiters
+
+
+@pytest.mark.asyncio
+async def test_rpc_server_dynamic_batching(start_server) -> None:
+    server, port = await start_server()
+    calls = []
+
+    @server.register(batch=rpc.BatchPolicy(max_size=3, max_wait=0.01))
+    def double(ctxs: list, batch: list) -> list:
+        calls.append(batch)
+        return [x * 2 for x, in batch]
+
+    @server.register('mismatched', batch=rpc.BatchPolicy(max_size=10, max_wait=0))
+    def mismatched(ctxs: list, batch: list) -> list:
+        return []
+
+    async with rpc.Client('127.0.0.1', port) as first, rpc.Client(
+        '127.0.0.1', port
+    ) as second:
+        results = await asyncio.gather(
+            first.invoke('double', 1),
+            second.invoke('double', 2),
+            first.invoke('double', 3),
+            second.invoke('double', 4),
+        )
+
+        assert results == [2, 4, 6, 8]
+        # The first three reach max_size, and the last one waits for max_wait
+        assert sorted(len(batch) for batch in calls) == [1, 3]
+
+        with pytest.raises(ServerError):
+            await first.invoke('mismatched')
+
+
+@pytest.mark.asyncio
+async def test_rpc_server_streaming(start_server, wait_until) -> None:
+    server, port = await start_server()
+    produced = []
+
+    @server.register('count')
+    async def count(ctx: rpc.Context, n: int):
+        for i in range(n):
+            produced.append(i)
+            yield i
+
+    @server.register('fail')
+    async def fail(ctx: rpc.Context):
+        yield 1
+        raise RuntimeError('failed')
+
+    def waiting_for_credit() -> bool:
+        return any(ctx._credit_waiter for ctx in server._contexts.values())
+
+    async with rpc.Client('127.0.0.1', port, stream_window=4) as client:
+        assert [i async for i in client.stream('count', 10)] == list(range(10))
+        # Invoked normally, the items are returned as a list
+        assert await client.invoke('count', 3) == [0, 1, 2]
+
+        produced.clear()
+        stream = client.stream('count', 10)
+        await wait_until(waiting_for_credit)
+
+        # The producer is paused once the window is used up
+        assert produced == [0, 1, 2, 3]
+
+        assert await stream.__anext__() == 0
+        assert await stream.__anext__() == 1
+        await wait_until(lambda: len(produced) == 6 and waiting_for_credit())
+
+        # Consuming half the window grants credit for more items
+        assert produced == list(range(6))
+        assert [i async for i in stream] == list(range(2, 10))
+        assert stream.done
+
+        async with client.stream('count', 10) as stream:
+            async for i in stream:
+                if i == 1:
+                    break
+
+        # Leaving the context manager early cancels the command
+        await wait_until(lambda: not server._contexts)
+
+        assert stream.done
+
+        stream = client.stream('fail')
+
+        assert await stream.__anext__() == 1
+
+        with pytest.raises(ServerError, match='failed'):
+            await stream.__anext__()
+
+        assert not client._streams
+        assert not server._contexts
+
+
+@pytest.mark.asyncio
+async def test_rpc_server_client_streaming(start_server, wait_until) -> None:
+    server, port = await start_server()
+    release = asyncio.Event()
+
+    @server.register('ingest')
+    async def ingest(ctx: rpc.Context, offset: int) -> int:
+        await release.wait()
+        return sum([chunk async for chunk in ctx.chunks]) + offset
+
+    @server.register('double')
+    async def double(ctx: rpc.Context):
+        async for chunk in ctx.chunks:
+            yield chunk * 2
+
+    async with rpc.Client('127.0.0.1', port, chunk_window=4) as client:
+        async with client.open('ingest', 100) as call:
+            for i in range(4):
+                await call.send(i)
+
+            sending = asyncio.ensure_future(call.send(4))
+            await wait_until(lambda: call._credit_waiter is not None)
+
+            # The server buffers at most chunk_window chunks
+            assert not sending.done()
+
+            release.set()
+            await sending
+
+            for i in range(5, 10):
+                await call.send(i)
+
+        assert await call.result() == 145
+
+        with pytest.raises(rpc.RpcError):
+            await call.send(10)
+
+        call = client.open('double')
+        results = []
+
+        for i in range(3):
+            await call.send(i)
+            results.append(await call.__anext__())
+
+        call.end()
+
+        assert results == [0, 2, 4]
+        assert [item async for item in call] == []
+        assert await call.result() is None
+        assert not client._streams
+
+
+@pytest.mark.asyncio
+async def test_rpc_server_cancel(start_server, wait_until) -> None:
+    server, port = await start_server()
+    cancelled = []
+    stopped = []
+    server.add_listener('command_cancelled', lambda ctx: cancelled.append(ctx))
+
+    @server.register('hang')
+    async def hang(ctx: rpc.Context) -> None:
+        try:
+            await asyncio.sleep(10)
+        finally:
+            stopped.append(ctx.command_name)
+
+    @server.register('forever')
+    async def forever(ctx: rpc.Context):
+        try:
+            while True:
+                yield 1
+        finally:
+            stopped.append(ctx.command_name)
+
+    async with rpc.Client('127.0.0.1', port) as client:
+        with pytest.raises(asyncio.TimeoutError):
+            await client.set(timeout=0.01).invoke('hang')
+
+        await wait_until(lambda: stopped)
+
+        assert stopped == ['hang']
+        assert isinstance(cancelled[0].error, rpc.CommandCancelled)
+        assert not server.in_flight
+
+        invoke = asyncio.ensure_future(client.invoke('hang'))
+        await wait_until(lambda: server.in_flight)
+        invoke.cancel()
+        await wait_until(lambda: len(stopped) == 2)
+
+        assert stopped == ['hang', 'hang']
+
+        stream = client.stream('forever')
+
+        assert await stream.__anext__() == 1
+
+        await stream.aclose()
+        await wait_until(lambda: len(stopped) == 3)
+
+        assert stopped == ['hang', 'hang', 'forever']
+        assert len(cancelled) == 3
+        assert not client._streams
+        assert not server._contexts
+
+
+@pytest.mark.asyncio
+async def test_rpc_server_notify(start_server) -> None:
+    server, port = await start_server()
+    recorded = []
+    errors = []
+    server.add_listener('command_error', errors.append)
+
+    @server.register('record')
+    def record(ctx: rpc.Context, value: int) -> int:
+        recorded.append(value)
+        return value
+
+    @server.register('fail')
+    def fail(ctx: rpc.Context) -> None:
+        raise ValueError
+
+    async with rpc.Client('127.0.0.1', port) as client:
+        client.notify('record', 1)
+        client.notify('fail')
+        client.notify('missing')
+
+        assert await client.invoke('record', 2) == 2
+        assert recorded == [1, 2]
+        assert len(errors) == 2
+        assert all(ctx.notification for ctx in errors)
+
+        # Only the invocation used a nonce
+        assert client._nonce == 1
+        assert not client._response_waiters
+        assert not server._contexts
+
+    with pytest.raises(NotConnected):
+        client.notify('record', 3)
+
+
+@pytest.mark.asyncio
+async def test_rpc_server_deadline(start_server) -> None:
+    server, port = await start_server()
+    expired = []
+    remaining = []
+    server.add_listener('command_expired', expired.append)
+
+    @server.register('remaining')
+    def get_remaining(ctx: rpc.Context) -> None:
+        remaining.append(ctx.remaining())
+
+    async with rpc.Client('127.0.0.1', port) as client:
+        await client.invoke('remaining')
+        await client.set(timeout=5).invoke('remaining')
+
+        assert remaining[0] is None
+        assert 4 < remaining[1] <= 5
+
+        # A deadline in the past, as if the command had been queued for too long
+        client._send_command(client._build_command('remaining', 100, (), time.time() - 1))
+        client._response_waiters[100] = fut = asyncio.get_running_loop().create_future()
+
+        with pytest.raises(rpc.DeadlineExceeded):
+            await fut
+
+        assert expired[0].command_name == 'remaining'
+        assert len(remaining) == 2
+
+
+def test_rpc_server_invalidate(server: rpc.Server, make_transport) -> None:
+    connections = []
+
+    for _ in range(2):
+        connection = Connection(server)
+        connection._transport = make_transport()
+        server._connections[connection.id] = connection
+        connections.append(connection)
+
+    first, legacy = connections
+    server.handle_hello(first)
+    server.invalidate('get_config', ['key']).invalidate('get_config')
+
+    assert first._transport.messages[1:] == [
+        [11, 'get_config', ['key']],
+        [11, 'get_config'],
+    ]
+    # Clients that didn't send the handshake can't parse protocol frames
+    assert not legacy._transport.written
+
+
+@pytest.mark.asyncio
+async def test_rpc_server_cache(start_server, wait_until) -> None:
+    server, port = await start_server()
+    calls = []
+
+    @server.register(cache=rpc.CachePolicy(ttl=10, maxsize=2))
+    async def square(ctx: rpc.Context, x: int) -> int:
+        calls.append(x)
+        await asyncio.sleep(0.01)
+        return x * x
+
+    @server.register('fail', cache=rpc.CachePolicy(ttl=0))
+    async def fail(ctx: rpc.Context) -> None:
+        calls.append(None)
+        await asyncio.sleep(0.01)
+        raise RuntimeError('failed')
+
+    hang_cancelled = asyncio.Event()
+
+    @server.register('hang', cache=rpc.CachePolicy(ttl=10))
+    async def hang(ctx: rpc.Context) -> None:
+        try:
+            await asyncio.sleep(10)
+        except asyncio.CancelledError:
+            hang_cancelled.set()
+            raise
+
+    async with rpc.Client('127.0.0.1', port) as first, rpc.Client(
+        '127.0.0.1', port
+    ) as second:
+        # Identical concurrent invocations share a single call
+        results = await asyncio.gather(
+            first.invoke('square', 3),
+            second.invoke('square', 3),
+            first.invoke('square', 4),
+        )
+
+        assert results == [9, 9, 16]
+        assert calls == [3, 4]
+
+        assert await second.invoke('square', 3) == 9
+        assert calls == [3, 4]
+
+        server.invalidate('square', [3])
+
+        assert await second.invoke('square', 3) == 9
+        assert calls == [3, 4, 3]
+
+        calls.clear()
+
+        results = await asyncio.gather(
+            first.invoke('fail'), second.invoke('fail'), return_exceptions=True
+        )
+
+        assert all(isinstance(result, ServerError) for result in results)
+        assert calls == [None]
+
+        # Errors are never cached
+        with pytest.raises(ServerError):
+            await first.invoke('fail')
+
+        assert calls == [None, None]
+
+        first_hang = asyncio.ensure_future(first.invoke('hang'))
+        second_hang = asyncio.ensure_future(second.invoke('hang'))
+        await wait_until(lambda: len(server._contexts) == 2)
+
+        # The call goes on while an invocation is still waiting for it
+        first_hang.cancel()
+        await wait_until(lambda: len(server._contexts) == 1)
+
+        assert not hang_cancelled.is_set()
+
+        second_hang.cancel()
+        await asyncio.wait_for(hang_cancelled.wait(), 1)
@@ -11,3 +11,32 @@ def test_rpc_utils_is_response() -> None:
     assert not utils.is_response(None)
     assert not utils.is_response({})
     assert utils.is_response({'__rpc_response__': None})
+
+
+def test_rpc_utils_is_compact_command() -> None:
+    assert not utils.is_compact_command(None)
+    assert not utils.is_compact_command([0, 0, 0])
+    assert not utils.is_compact_command([1, 0, 0, []])
+    assert utils.is_compact_command([0, 0, 0, []])
+
+
+def test_rpc_utils_is_compact_response() -> None:
+    assert not utils.is_compact_response(None)
+    assert not utils.is_compact_response([1, 0])
+    assert not utils.is_compact_response([0, 0, 0, []])
+    assert utils.is_compact_response([1, 0, None])
+    assert utils.is_compact_response([2, 0, 'error', 'code'])
+
+
+def test_rpc_utils_is_stream() -> None:
+    assert not utils.is_stream([0, 0, 0, []])
+    assert utils.is_stream([5, 0, 'command', [], 32])
+    assert utils.is_stream_item([6, 0, None])
+    assert not utils.is_stream_item([6, 0])
+    assert utils.is_credit([7, 0, 16])
+
+
+def test_rpc_utils_is_notification() -> None:
+    assert utils.is_notification([12, 'command', []])
+    assert not utils.is_notification([12, 0, 'command', []])
+    assert not utils.is_notification([0, 0, 'command'])
@@ -1,8 +1,10 @@
+import re
 import types
 
 import pytest
 
 import ipc
+from ipc.core.base_connection import encode_frame
 
 
 @pytest.fixture
@@ -36,3 +38,110 @@ def test_server_default_disconnect_handler(server: ipc.Server) -> None:
         server.on_disconnect(None, exc)
 
     server.on_disconnect(None, None)
+
+
+@pytest.mark.asyncio
+async def test_server_connection_registry(server: ipc.Server, make_transport) -> None:
+    first = ipc.Connection(server)
+    second = ipc.Connection(server)
+
+    assert second.id > first.id
+
+    first._protocol_cb_connection_made(make_transport())
+    second._protocol_cb_connection_made(make_transport())
+
+    view = server.iter_connections()
+
+    assert server.connections == [first, second]
+
+    assert list(view) == [first, second]
+    assert server.get_connection(first.id) is first
+    assert server.get_connection(second.id) is second
+
+    first._protocol_cb_connection_lost(None)
+
+    assert list(view) == [second]
+    assert server.get_connection(first.id) is None
+    assert ipc.Connection(server).id > second.id
+
+
+def test_server_broadcast(server: ipc.Server, make_transport) -> None:
+    connections = [ipc.Connection(server) for _ in range(3)]
+
+    for connection in connections:
+        connection._transport = make_transport()
+        server._connections[connection.id] = connection
+
+    first, paused, closed = connections
+    paused._paused = True
+    del closed._transport
+
+    result = server.broadcast([1])
+
+    assert result == (1, [], [paused, closed])
+    assert first._transport.written == [b'3 [1]']  # type: ignore
+
+    result = server.broadcast('a', [first, paused], skip_paused=False)
+
+    assert result == (1, [paused], [])
+    assert first._transport.written[1] == b'3 "a"'  # type: ignore
+    assert paused._write_buffer == b'3 "a"'
+
+
+@pytest.mark.asyncio
+async def test_server_publish(server: ipc.Server, make_transport) -> None:
+    first, second = ipc.Connection(server), ipc.Connection(server)
+
+    for connection in (first, second):
+        connection._protocol_cb_connection_made(make_transport())
+
+    first._handle_protocol_message({'__ipc_subscribe__': ['a.*', 'a.#.b', 1, [1]]})
+    first._handle_protocol_message({'__ipc_unsubscribe__': [[1]]})
+    second._handle_protocol_message({'__ipc_subscribe__': ['b']})
+    # User data that looks like a subscription is left alone
+    second._handle_message({'__ipc_subscribe__': ['a.*']})
+
+    assert first.subscriptions == {'a.*'}
+    assert second.subscriptions == {'b'}
+
+    assert server.publish('a.x', 1) == (1, [], [])
+    assert server.publish('c', 1) == (0, [], [])
+    frame = encode_frame({'__ipc_publish__': 'a.x', 'data': 1}, protocol=True)
+
+    assert first._transport.written == [frame]  # type: ignore
+    assert second._transport.written == []  # type: ignore
+
+    first._handle_protocol_message({'__ipc_unsubscribe__': ['a.*']})
+
+    assert server.publish('a.x', 1) == (0, [], [])
+
+    second._protocol_cb_connection_lost(None)
+
+    assert not server._topics
+
+
+@pytest.mark.asyncio
+async def test_server_heartbeat(transport, wait_until) -> None:
+    server = ipc.Server('', 0, heartbeat_interval=0.01, idle_timeout=0.025)
+    connection = ipc.Connection(server)
+    connection._protocol_cb_connection_made(transport)
+
+    assert connection._heartbeat_timer is not None
+    assert connection.rtt is None
+
+    await wait_until(lambda: transport.written)
+
+    assert len(transport.written) == 1
+    assert not transport.aborted
+
+    ping = transport.messages[0]
+
+    # Heartbeats are protocol frames, so they can't be mistaken for user data
+    assert re.match(rb'\d+:', transport.written[0])
+
+    connection._handle_protocol_message({'__ipc_pong__': ping['__ipc_ping__']})
+
+    assert connection.rtt is not None
+
+    # The connection is aborted once no pong arrives within idle_timeout
+    await wait_until(lambda: transport.aborted)
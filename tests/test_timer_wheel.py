@@ -0,0 +1,82 @@
+import pytest
+
+from ipc.core import timer_wheel
+from ipc.core.timer_wheel import TimerWheel
+
+
+def test_timer_wheel_raise_value_error() -> None:
+    with pytest.raises(ValueError):
+        TimerWheel(0)
+
+
+class FakeTimer:
+    def __init__(self, when: float) -> None:
+        self.when = when
+
+    def cancel(self) -> None:
+        pass
+
+
+class FakeLoop:
+    def __init__(self) -> None:
+        self.now = 0.0
+        self.scheduled = []
+
+    def time(self) -> float:
+        return self.now
+
+    def call_at(self, when: float, callback, *args) -> FakeTimer:
+        timer = FakeTimer(when)
+        self.scheduled.append(timer)
+        return timer
+
+
+def test_timer_wheel_call_later(monkeypatch: pytest.MonkeyPatch) -> None:
+    loop = FakeLoop()
+    monkeypatch.setattr(timer_wheel, 'get_running_loop', lambda: loop)
+
+    wheel = TimerWheel(1, slots=4)
+    fired = []
+
+    wheel.call_later(2, fired.append, 1)
+    # Further than the ring, so it is kept for an additional round
+    wheel.call_later(6, fired.append, 2)
+    cancelled = wheel.call_later(2, fired.append, 3)
+    cancelled.cancel()
+    cancelled.cancel()
+
+    assert len(wheel) == 2
+    assert not cancelled.active
+    assert loop.scheduled[-1].when == 1
+
+    def advance(to: float) -> None:
+        loop.now = to
+        wheel._tick()
+
+    advance(1)
+    assert fired == []
+
+    advance(2)
+    assert fired == [1]
+
+    # The loop was blocked, so the wheel catches up on every due tick
+    advance(5.5)
+    assert fired == [1]
+    assert loop.scheduled[-1].when == 6
+
+    advance(6)
+    assert fired == [1, 2]
+    assert len(wheel) == 0
+    assert wheel._ticker is None
+
+
+@pytest.mark.asyncio
+async def test_timer_wheel_close() -> None:
+    wheel = TimerWheel(0.001)
+    handle = wheel.call_later(0.001, lambda: None)
+
+    wheel.close()
+
+    assert not handle.active
+    assert len(wheel) == 0
+    assert wheel._ticker is None
@@ -0,0 +1,45 @@
+import pytest
+
+from ipc.core.topics import TopicTrie, validate_pattern
+
+
+@pytest.fixture
+def topics() -> TopicTrie:
+    return TopicTrie()
+
+
+def test_topics_validate_pattern() -> None:
+    validate_pattern('a.*.#')
+
+    with pytest.raises(ValueError):
+        validate_pattern('a.#.b')
+
+    with pytest.raises(TypeError):
+        validate_pattern(None)  # type: ignore
+
+
+def test_topics_match(topics: TopicTrie) -> None:
+    topics.add('a.b', 1)
+    topics.add('a.*', 2)
+    topics.add('a.#', 3)
+    topics.add('#', 4)
+    topics.add('*.c', 5)
+
+    assert topics.match('a.b') == {1, 2, 3, 4}
+    assert topics.match('a.c') == {2, 3, 4, 5}
+    assert topics.match('a') == {3, 4}
+    assert topics.match('a.b.c') == {3, 4}
+    assert topics.match('b') == {4}
+
+
+def test_topics_remove(topics: TopicTrie) -> None:
+    topics.add('a.b.c', 1)
+    topics.add('a.b.c', 2)
+
+    topics.remove('a.b.c', 1)
+    assert topics.match('a.b.c') == {2}
+
+    topics.remove('a.x', 2)
+    topics.remove('a.b.c', 2)
+    assert topics.match('a.b.c') == set()
+    assert not topics